@@ -1,16 +1,45 @@
 from __future__ import annotations
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_CORE_CONFIG_UPDATE
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.start import async_at_started
 from homeassistant.helpers.typing import ConfigType
 
-PLATFORMS = ["binary_sensor"]
+from .const import DATA_HUB, DOMAIN
+from .hub import get_hub
+from .services import async_setup_services
+from .sources import clear_timestamp_cache
+from .store import get_price_store
+
+PLATFORMS = ["binary_sensor", "calendar"]
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
+    await get_price_store(hass).async_load()
+
+    @callback
+    def _async_core_config_updated(event: Event) -> None:
+        # Naive source timestamps are read in the configured time zone.
+        if "time_zone" in event.data:
+            clear_timestamp_cache()
+            get_price_store(hass).invalidate()
+
+    hass.bus.async_listen(EVENT_CORE_CONFIG_UPDATE, _async_core_config_updated)
+
+    @callback
+    def _async_started(hass: HomeAssistant) -> None:
+        get_price_store(hass).async_started()
+
+    async_at_started(hass, _async_started)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    # One hub owns the source listeners and the wake-up timer of every
+    # sensor; the sensors register with it when they are added.
+    get_hub(hass)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     unsub = entry.add_update_listener(async_reload_entry)
     entry.async_on_unload(unsub)
@@ -18,7 +47,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    hub = hass.data.get(DOMAIN, {}).get(DATA_HUB)
+    if unloaded and hub is not None and hub.is_idle:
+        hub.async_shutdown()
+        hass.data[DOMAIN].pop(DATA_HUB)
+    if unloaded:
+        # Sources only the removed sensor read are no longer kept.
+        get_price_store(hass).async_prune()
+    return unloaded
 
 
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
@@ -1,41 +1,117 @@
 from __future__ import annotations
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from collections.abc import Callable
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import template
+from homeassistant.const import ATTR_FRIENDLY_NAME
+from homeassistant.core import HomeAssistant, ServiceResponse, SupportsResponse
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
 from homeassistant.helpers.event import (
-    async_track_state_change_event,
-    async_track_time_interval,
     async_track_template_result,
     TrackTemplate,
 )
 from homeassistant.util import dt as dt_util
 
 from .const import (
+    DATA_EVENTS,
+    DATA_STATS,
+    DOMAIN,
     ATTR_AVERAGE,
     ATTR_CONTINUOUS,
+    ATTR_COST,
+    ATTR_CURRENT_PRICE,
+    ATTR_CUTOFF_PRICE,
     ATTR_DURATION,
     ATTR_END_TIME,
+    ATTR_ENERGY,
+    ATTR_HOURS_AT_OR_BELOW,
     ATTR_INTERVALS,
     ATTR_LAST_CALCULATED,
+    ATTR_MODE,
     ATTR_NEXT_START_TIME,
+    ATTR_PLAN,
+    ATTR_PRICE_RANK,
     ATTR_START_TIME,
+    ATTRIBUTES_FULL,
+    ATTRIBUTES_NEXT,
+    CONF_ATTRIBUTES,
     CONF_CONTINUOUS,
+    CONF_DEBOUNCE_MS,
     CONF_DURATION,
     CONF_END_TIME,
+    CONF_EXECUTOR,
+    CONF_MAX_BLOCKS,
+    CONF_MAX_INTERVALS,
+    CONF_MIN_BLOCK,
+    CONF_MIN_GAP,
+    CONF_MODE,
+    CONF_PERCENTILE,
+    CONF_PLANNING,
+    CONF_PROFILE_STEP,
+    CONF_THRESHOLD,
     CONF_SOURCE_ENTITY,
     CONF_FORECAST_SOURCE_ENTITY,
+    CONF_LOAD_PROFILE,
     CONF_START_TIME,
     CONF_NAME,
+    CONF_WRITE_ON_CHANGE_ONLY,
+    DEFAULT_ATTRIBUTES,
+    DEFAULT_MAX_INTERVALS,
     DEFAULT_NAME,
     DEFAULT_START_TIME,
     DEFAULT_END_TIME,
     DEFAULT_DURATION,
     DEFAULT_CONTINUOUS,
+    DEFAULT_DEBOUNCE_MS,
+    DEFAULT_EXECUTOR,
+    DEFAULT_MODE,
+    DEFAULT_PERCENTILE,
+    DEFAULT_PLANNING,
+    DEFAULT_PROFILE_STEP,
+    DEFAULT_WRITE_ON_CHANGE_ONLY,
+    EXECUTOR_PROCESS,
+    MODE_PERCENTILE,
+    MODE_PROFILE,
+    MODE_THRESHOLD,
+    MODE_WINDOW,
+    OFFLOAD_MIN_SEGMENTS,
+    SERVICE_GET_INTERVALS,
+    SIGNAL_EVENTS_UPDATED,
+)
+from .core import (
+    Interval,
+    IntervalIndex,
+    PlanEntry,
+    PriceRanking,
+    PriceSeries,
+    ProfileIndex,
+    WindowIndex,
+    build_index,
+    intervals_at_or_below,
+    intervals_average,
+    plan_windows,
+    price_at,
+)
+from .executor import async_run_offloaded
+from .hub import get_hub
+from .stats import RecalcStats
+from .store import get_price_store
+from .util import (
+    ConfigValue,
+    day_ranges,
+    format_intervals,
+    parse_block_constraints,
+    parse_bool,
+    parse_duration,
+    parse_load_profile,
+    parse_time_value,
+    resolve_range,
+    to_local,
 )
 
 
@@ -43,10 +119,58 @@ async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities
 ) -> None:
     async_add_entities([PriceWindowBinarySensor(hass, entry)])
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_GET_INTERVALS,
+        {},
+        "async_get_intervals",
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+class PriceWindowExtraData(ExtraStoredData):
+    """Computed windows kept across restarts as plain [start, end, avg]
+    lists in epoch seconds."""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        intervals: List[Interval],
+        plan: List[PlanEntry],
+    ) -> None:
+        self.config = config
+        self.intervals = intervals
+        self.plan = plan
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "config": self.config,
+            "intervals": [list(iv) for iv in self.intervals],
+            "plan": [[r0, r1, [list(iv) for iv in ivs]] for r0, r1, ivs in self.plan],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional[PriceWindowExtraData]:
+        try:
+            return cls(
+                data["config"],
+                [tuple(iv) for iv in data["intervals"]],
+                [
+                    (r0, r1, [tuple(iv) for iv in ivs])
+                    for r0, r1, ivs in data["plan"]
+                ],
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
 
 
-class PriceWindowBinarySensor(BinarySensorEntity):
+class PriceWindowBinarySensor(BinarySensorEntity, RestoreEntity):
     _should_poll = False
+    # The interval lists can be long and change with every price update;
+    # keep them out of the recorder. get_intervals serves them on demand.
+    _unrecorded_attributes = frozenset(
+        {ATTR_INTERVALS, ATTR_PLAN, ATTR_LAST_CALCULATED}
+    )
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         self.hass = hass
@@ -57,531 +181,499 @@ class PriceWindowBinarySensor(BinarySensorEntity):
         self._attr_name = name
         self._entity_id = data[CONF_SOURCE_ENTITY]
         self._forecast_entity_id = data.get(CONF_FORECAST_SOURCE_ENTITY)
+        self._store = get_price_store(hass)
 
-        raw_start = data.get(CONF_START_TIME, DEFAULT_START_TIME)
-        raw_end = data.get(CONF_END_TIME, DEFAULT_END_TIME)
-
-        self._tmpl_start = (
-            template.Template(str(raw_start), hass) if raw_start else None
+        # Literal values ("22:00", "3:00") are parsed here once; only real
+        # templates are rendered and tracked.
+        self._start = ConfigValue(
+            hass, data.get(CONF_START_TIME, DEFAULT_START_TIME), parse_time_value
         )
-        self._tmpl_end = template.Template(str(raw_end), hass) if raw_end else None
-
-        self._tmpl_duration = template.Template(
-            str(data.get(CONF_DURATION, DEFAULT_DURATION)), hass
+        self._end = ConfigValue(
+            hass, data.get(CONF_END_TIME, DEFAULT_END_TIME), parse_time_value
+        )
+        self._duration = ConfigValue(
+            hass, data.get(CONF_DURATION, DEFAULT_DURATION), parse_duration
         )
         self._continuous_raw = data.get(CONF_CONTINUOUS, DEFAULT_CONTINUOUS)
+        self._constraints = parse_block_constraints(
+            data.get(CONF_MIN_BLOCK), data.get(CONF_MAX_BLOCKS), data.get(CONF_MIN_GAP)
+        )
+        self._mode = data.get(CONF_MODE, DEFAULT_MODE)
+        self._percentile = float(data.get(CONF_PERCENTILE, DEFAULT_PERCENTILE))
+        threshold = data.get(CONF_THRESHOLD)
+        self._threshold = float(threshold) if threshold not in (None, "") else None
+        self._profile = parse_load_profile(data.get(CONF_LOAD_PROFILE))
+        step = parse_duration(data.get(CONF_PROFILE_STEP) or DEFAULT_PROFILE_STEP)
+        self._profile_step = step.total_seconds() if step else 0.0
+        self._planning = bool(data.get(CONF_PLANNING, DEFAULT_PLANNING))
+        self._attributes = data.get(CONF_ATTRIBUTES, DEFAULT_ATTRIBUTES)
+        self._max_intervals = int(data.get(CONF_MAX_INTERVALS, DEFAULT_MAX_INTERVALS))
+        self._executor = data.get(CONF_EXECUTOR, DEFAULT_EXECUTOR)
+        self._write_on_change_only = bool(
+            data.get(CONF_WRITE_ON_CHANGE_ONLY, DEFAULT_WRITE_ON_CHANGE_ONLY)
+        )
+        self._config = data
 
         self._attr_unique_id = f"{entry.entry_id}"
         self._attr_is_on = False
         self._attr_extra_state_attributes: Dict[str, Any] = {}
         self._unsub_tmpl: List[Callable[[], None]] = []
+        self._last_result: Optional[Tuple[Any, ...]] = None
+        self._last_calculated: Optional[datetime] = None
+        self._index: Optional[WindowIndex] = None
+        self._index_key: Optional[Tuple[Any, ...]] = None
+        self._ranking: Optional[PriceRanking] = None
+        self._ranking_key: Optional[Tuple[Any, ...]] = None
+        self._plan: List[PlanEntry] = []
+        self._plan_key: Optional[Tuple[Any, ...]] = None
+        self._events: Optional[Tuple[Interval, ...]] = None
+        self._intervals: List[Interval] = []
+        self._plan_restored = False
+        self._stats = RecalcStats()
+        # Triggers within this many seconds are merged by the hub; sensors
+        # with the same setting are recalculated in one batch.
+        self.debounce = float(data.get(CONF_DEBOUNCE_MS, DEFAULT_DEBOUNCE_MS)) / 1000
+        self._hub = get_hub(hass)
 
     async def async_added_to_hass(self) -> None:
         watch = [self._entity_id]
         if self._forecast_entity_id:
             watch.append(self._forecast_entity_id)
-        self.async_on_remove(
-            async_track_state_change_event(self.hass, watch, self._handle_change)
-        )
-        self.async_on_remove(
-            async_track_time_interval(
-                self.hass, self._handle_time_tick, timedelta(minutes=1)
-            )
-        )
+        self.async_on_remove(self._hub.async_add_sensor(self, watch))
 
-        def _sub_tmpl(tmpl: template.Template | None):
-            if tmpl is None:
+        def _sub_tmpl(value: ConfigValue):
+            if value.is_static:
                 return
+
+            async def _handle_result(event, updates) -> None:
+                value.set_result(updates[-1].result)
+                await self._hub.async_trigger(self, "template")
+
             res = async_track_template_result(
-                self.hass, [TrackTemplate(tmpl, None)], self._handle_template_result
+                self.hass, [TrackTemplate(value.template, None)], _handle_result
             )
             self._unsub_tmpl.append(res.async_remove)
 
-        _sub_tmpl(self._tmpl_start)
-        _sub_tmpl(self._tmpl_end)
-        _sub_tmpl(self._tmpl_duration)
-
-        await self._recalc()
+        _sub_tmpl(self._start)
+        _sub_tmpl(self._end)
+        _sub_tmpl(self._duration)
+
+        self.hass.data.setdefault(DOMAIN, {}).setdefault(DATA_STATS, {})[
+            self._entry.entry_id
+        ] = self._stats
+        await self._async_restore()
+        # Queued like any other trigger, so a source change during the first
+        # (possibly offloaded) recalculation cannot start a second one.
+        await self._hub.async_trigger(self, "startup")
+
+    @property
+    def extra_restore_state_data(self) -> PriceWindowExtraData:
+        return PriceWindowExtraData(self._config, self._intervals, self._plan)
+
+    async def _async_restore(self) -> None:
+        """Serve the windows computed before the restart until the first
+        recalculation replaces them."""
+        last_state = await self.async_get_last_state()
+        extra_data = await self.async_get_last_extra_data()
+        if last_state is None or extra_data is None:
+            return
+        restored = PriceWindowExtraData.from_dict(extra_data.as_dict())
+        if restored is None or restored.config != self._config:
+            return
+        now_ts = dt_util.utcnow().timestamp()
+        self._intervals = list(restored.intervals)
+        if self._planning:
+            self._plan = restored.plan
+            self._plan_restored = True
+        self._attr_is_on = any(s <= now_ts < e for s, e, _ in self._intervals)
+        self._attr_extra_state_attributes = {
+            k: v for k, v in last_state.attributes.items() if k != ATTR_FRIENDLY_NAME
+        }
+        self._update_events(self._intervals)
+        self._schedule_wakeup(
+            [t for s, e, _ in self._intervals for t in (s, e)], now_ts
+        )
 
     async def async_will_remove_from_hass(self) -> None:
+        domain_data = self.hass.data.get(DOMAIN, {})
+        domain_data.get(DATA_STATS, {}).pop(self._entry.entry_id, None)
+        domain_data.get(DATA_EVENTS, {}).pop(self._entry.entry_id, None)
         for u in self._unsub_tmpl:
             try:
                 u()
             except Exception:
                 pass
 
-    async def _handle_change(self, *_):
-        await self._recalc()
-
-    async def _handle_time_tick(self, *_):
+    async def async_hub_update(self, kinds: List[str]) -> None:
+        """Recalculate for the triggers the hub merged since the last batch
+        (startup, source, timer or template); the hub never runs two at once."""
+        for kind in kinds:
+            self._stats.trigger(kind)
+        if len(kinds) > 1:
+            self._stats.trigger("coalesced", len(kinds) - 1)
         await self._recalc()
 
-    async def _handle_template_result(self, *_):
-        await self._recalc()
-
-    def _render_native(self, tmpl: template.Template | None) -> Any:
-        if tmpl is None:
-            return None
-        try:
-            return tmpl.async_render(parse_result=True)
-        except TypeError:
-            return tmpl.async_render()
-
-    def _parse_datetime(self, value: Any) -> Optional[datetime]:
-        if isinstance(value, datetime):
-            return (
-                value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-                if value.tzinfo is None
-                else value
-            )
-        if isinstance(value, str):
-            dt = dt_util.parse_datetime(value)
-            if dt:
-                return (
-                    dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-                    if dt.tzinfo is None
-                    else dt
-                )
-            try:
-                naive = datetime.fromisoformat(value)
-                return naive.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-            except Exception:
-                return None
-        return None
-
-    def _parse_today_time(self, value: Any, now_local: datetime) -> Optional[datetime]:
-        if not isinstance(value, str):
-            return None
-        s = value.strip()
-        if ":" not in s or "T" in s or "-" in s or "/" in s:
-            return None
-        try:
-            parts = s.split(":")
-            h = int(parts[0])
-            m = int(parts[1])
-            sec = float(parts[2]) if len(parts) > 2 else 0.0
-            sec_i = int(sec)
-            micro = int(round((sec - sec_i) * 1_000_000))
-            if now_local.tzinfo is None:
-                now_local = now_local.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-            base = dt_util.as_local(now_local)
-            out = base.replace(hour=h, minute=m, second=sec_i, microsecond=micro)
-            if out.tzinfo is None:
-                out = out.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-            return out
-        except Exception:
-            return None
+    def _schedule_wakeup(self, points: Iterable[float], now_ts: float) -> None:
+        """Ask the hub to wake us at the earliest future point (epoch seconds).
 
-    def _parse_duration(self, value: Any) -> Optional[timedelta]:
-        if isinstance(value, timedelta):
-            return value
-        if isinstance(value, (int, float)):
-            return timedelta(hours=float(value))
-        if isinstance(value, str):
-            v = value.strip()
-            if ":" in v:
-                parts = v.split(":")
-                if len(parts) >= 2:
-                    try:
-                        h = float(parts[0])
-                        m = float(parts[1])
-                        s = float(parts[2]) if len(parts) > 2 else 0.0
-                        return timedelta(hours=h, minutes=m, seconds=s)
-                    except Exception:
-                        return None
-            try:
-                return timedelta(hours=float(v))
-            except Exception:
-                return None
-        return None
-
-    def _parse_bool(self, value: Any) -> bool:
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, (int, float)):
-            return bool(value)
-        if isinstance(value, str):
-            v = value.strip().lower()
-            if v in ("true", "on", "1", "yes"):
-                return True
-            if v in ("false", "off", "0", "no"):
-                return False
-        return False
-
-    def _coerce_dt(self, val: Any) -> Optional[datetime]:
-        if isinstance(val, datetime):
-            if val.tzinfo is None:
-                val = val.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-            return dt_util.as_local(val)
-        if isinstance(val, str):
-            return self._parse_datetime(val)
-        return None
-
-    def _read_items_from_entity(self, entity_id: str) -> List[dict]:
-        ent = self.hass.states.get(entity_id)
-        if not ent:
-            return []
-        attrs = ent.attributes or {}
-        raw_prices = attrs.get("prices") or []
-        if raw_prices:
-            out: List[dict] = []
-            for p in raw_prices:
-                if not isinstance(p, dict):
-                    continue
-                st = self._coerce_dt(p.get("start"))
-                ed = self._coerce_dt(p.get("end"))
-                pr = p.get("price")
-                if st is None or ed is None or pr is None:
-                    continue
-                if ed <= st:
-                    continue
-                out.append({"start": st, "end": ed, "price": float(pr)})
-            out.sort(key=lambda x: x["start"])
-            return out
-
-        raw_today = attrs.get("raw_today") or []
-        raw_tomorrow = attrs.get("raw_tomorrow") or []
-        arr = list(raw_today) + list(raw_tomorrow)
-        if len(arr) == 0:
-            return []
-
-        def _coerce_hour(x: Any) -> Optional[datetime]:
-            h = x.get("hour") if isinstance(x, dict) else None
-            if isinstance(h, datetime):
-                if h.tzinfo is None:
-                    h = h.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-                return dt_util.as_local(h)
-            if isinstance(h, str):
-                return self._parse_datetime(h)
-            return None
-
-        items: List[dict] = []
-        slot = None
-        if len(arr) >= 2:
-            h0 = _coerce_hour(arr[0])
-            h1 = _coerce_hour(arr[1])
-            if h0 and h1 and h1 > h0:
-                slot = h1 - h0
-        for p in arr:
-            if not isinstance(p, dict):
-                continue
-            h = _coerce_hour(p)
-            pr = p.get("price")
-            if h is None or pr is None:
-                continue
-            if slot is None:
-                slot = timedelta(hours=1)
-            items.append({"start": h, "end": h + slot, "price": float(pr)})
-        items.sort(key=lambda x: x["start"])
-        return items
-
-    def _merge_overlaps(
-        self, intervals: List[Tuple[datetime, datetime]]
-    ) -> List[Tuple[datetime, datetime]]:
-        if not intervals:
-            return []
-        ints = sorted(intervals, key=lambda x: x[0])
-        out = []
-        cs, ce = ints[0]
-        for s, e in ints[1:]:
-            if s <= ce:
-                if e > ce:
-                    ce = e
-            else:
-                out.append((cs, ce))
-                cs, ce = s, e
-        out.append((cs, ce))
-        return out
+        The result only changes when a source or template changes (handled by
+        their own listeners) or when time crosses one of these points.
+        """
+        future = [t for t in points if t > now_ts]
+        self._hub.async_schedule(self, min(future) if future else None)
 
-    def _subtract_blockers(
+    def _wakeup_points(
         self,
-        segment: Tuple[datetime, datetime],
-        blockers: List[Tuple[datetime, datetime]],
-    ) -> List[Tuple[datetime, datetime]]:
-        s0, e0 = segment
-        if not blockers:
-            return [(s0, e0)]
-        rem = [(s0, e0)]
-        for bs, be in blockers:
-            new_rem = []
-            for rs, re in rem:
-                if be <= rs or bs >= re:
-                    new_rem.append((rs, re))
-                    continue
-                if bs <= rs and be >= re:
-                    continue
-                if bs <= rs < be < re:
-                    new_rem.append((be, re))
-                    continue
-                if rs < bs < re <= be:
-                    new_rem.append((rs, bs))
-                    continue
-                if rs < bs and be < re:
-                    new_rem.append((rs, bs))
-                    new_rem.append((be, re))
-                    continue
-            rem = new_rem
-            if not rem:
-                break
-        return rem
-
-    def _clip_to_range(
-        self, s: datetime, e: datetime, r0: datetime, r1: datetime
-    ) -> Optional[Tuple[datetime, datetime]]:
-        def _loc(d: datetime) -> datetime:
-            if d.tzinfo is None:
-                d = d.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-            return dt_util.as_local(d)
-
-        s = _loc(s)
-        e = _loc(e)
-        r0 = _loc(r0)
-        r1 = _loc(r1)
-        if e <= r0 or s >= r1:
-            return None
-        return max(s, r0), min(e, r1)
-
-    def _time_weighted_avg(self, segs: List[dict]) -> Optional[float]:
-        total = 0.0
-        w = 0.0
-        for seg in segs:
-            d = (seg["end"] - seg["start"]).total_seconds()
-            if d <= 0:
-                continue
-            total += seg["price"] * d
-            w += d
-        if w <= 0:
-            return None
-        return total / w
+        segs: PriceSeries,
+        intervals: List[Interval],
+        start_dt: datetime,
+        end_dt: datetime,
+        now_local: datetime,
+    ) -> List[float]:
+        now_ts = now_local.timestamp()
+        points = [start_dt.timestamp(), end_dt.timestamp()]
+        for s, e, _ in intervals:
+            points.append(s)
+            points.append(e)
+        if segs:
+            # current_price and price_rank follow the current segment; with
+            # the range starting at "now", a passing segment start also
+            # drops a candidate window.
+            i = bisect_right(segs.starts, now_ts)
+            if i < len(segs):
+                points.append(segs.starts[i])
+        if self._start.configured or self._end.configured:
+            # Time-of-day values resolve against today's date.
+            midnight = dt_util.start_of_local_day(now_local) + timedelta(days=1)
+            points.append(midnight.timestamp())
+        return points
 
     async def _recalc(self) -> None:
+        with self._stats.recalc():
+            await self._async_recalc()
+
+    async def _async_recalc(self) -> None:
         now_local = dt_util.now()
+        stats = self._stats
 
-        primary = self._read_items_from_entity(self._entity_id)
+        with stats.stage("read"):
+            primary = self._store.get(self._entity_id)
+            if self._forecast_entity_id:
+                self._store.get(self._forecast_entity_id)
         if not primary:
             return
 
-        if len(primary) >= 1:
-            primary_slot = primary[0]["end"] - primary[0]["start"]
-            if len(primary) >= 2:
-                d = primary[1]["start"] - primary[0]["start"]
-                if d.total_seconds() > 0:
-                    primary_slot = d
-        else:
-            return
-
-        forecast: List[dict] = []
-        if self._forecast_entity_id:
-            rawf = self._read_items_from_entity(self._forecast_entity_id)
-            if rawf:
-                blockers = self._merge_overlaps(
-                    [(p["start"], p["end"]) for p in primary]
-                )
-                for f in rawf:
-                    parts = self._subtract_blockers((f["start"], f["end"]), blockers)
-                    for s, e in parts:
-                        if e > s:
-                            forecast.append({"start": s, "end": e, "price": f["price"]})
-
-        items_all = sorted(primary + forecast, key=lambda x: x["start"])
-
-        start_val = self._render_native(self._tmpl_start)
-        end_val = self._render_native(self._tmpl_end)
-        duration_val = self._render_native(self._tmpl_duration)
-
-        start_dt = None
-        if start_val is not None:
-            start_dt = self._parse_today_time(
-                start_val, now_local
-            ) or self._parse_datetime(start_val)
-        if start_dt is None:
-            start_dt = now_local
-
-        end_dt = None
-        if end_val is not None:
-            end_dt = self._parse_today_time(end_val, now_local) or self._parse_datetime(
-                end_val
+        with stats.stage("merge"):
+            items_all = self._store.timeline(
+                self._entity_id, self._forecast_entity_id
             )
-        if end_dt is None:
-            end_dt = items_all[-1]["end"]
-
-        if start_dt.tzinfo is None:
-            start_dt = start_dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-        if end_dt.tzinfo is None:
-            end_dt = end_dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
-
-        if end_dt <= now_local:
-            end_dt = end_dt + timedelta(days=1)
 
-        duration_td = self._parse_duration(duration_val)
+        start_val = self._start.value()
+        end_val = self._end.value()
+        if self._mode == MODE_PROFILE:
+            # A run lasts exactly as long as its load profile.
+            if not self._profile or self._profile_step <= 0:
+                return
+            duration_td = timedelta(seconds=len(self._profile) * self._profile_step)
+        else:
+            duration_td = self._duration.value()
         if not duration_td:
-            return
-
-        if start_dt + duration_td > end_dt:
-            end_dt = start_dt + duration_td
+            if self._mode == MODE_WINDOW:
+                return
+            # Only the window and profile modes need a duration.
+            duration_td = timedelta(0)
+
+        start_dt, end_dt = resolve_range(
+            start_val,
+            end_val,
+            duration_td,
+            now_local,
+            items_all.end(len(items_all) - 1),
+        )
 
         continuous = (
             self._continuous_raw
             if isinstance(self._continuous_raw, bool)
-            else self._parse_bool(self._continuous_raw)
+            else parse_bool(self._continuous_raw)
         )
 
-        segs = []
-        for it in items_all:
-            clipped = self._clip_to_range(it["start"], it["end"], start_dt, end_dt)
-            if clipped:
-                s, e = clipped
-                segs.append({"start": s, "end": e, "price": it["price"]})
+        plan_entry: Optional[PlanEntry] = None
+        if self._planning and self._mode == MODE_WINDOW:
+            with stats.stage("search"):
+                plan_entry = await self._current_plan_entry(
+                    items_all,
+                    start_val,
+                    end_val,
+                    duration_td,
+                    bool(continuous),
+                    now_local,
+                )
+            if plan_entry is not None:
+                start_dt, end_dt = to_local(plan_entry[0]), to_local(plan_entry[1])
+
+        with stats.stage("clip"):
+            segs = items_all.clip(start_dt.timestamp(), end_dt.timestamp())
+        stats.segments = len(segs)
         if not segs:
-            self._attr_is_on = False
-            self._attr_extra_state_attributes = {
-                ATTR_INTERVALS: [],
+            attrs = {
                 ATTR_START_TIME: start_dt.isoformat(),
                 ATTR_END_TIME: end_dt.isoformat(),
                 ATTR_DURATION: duration_td.total_seconds() / 3600,
                 ATTR_CONTINUOUS: bool(continuous),
+                ATTR_MODE: self._mode,
                 "next_start_time": None,
                 "average": None,
                 ATTR_LAST_CALCULATED: now_local.isoformat(),
             }
-            self.async_write_ha_state()
+            self._add_interval_attrs(attrs, [], now_local.timestamp())
+            self._schedule_wakeup(
+                self._wakeup_points(segs, [], start_dt, end_dt, now_local),
+                now_local.timestamp(),
+            )
+            with stats.stage("write"):
+                self._publish(False, attrs, [], None, now_local)
             return
-        segs.sort(key=lambda x: x["start"])
 
-        candidates = [
-            s["start"]
-            for s in segs
-            if s["start"] >= start_dt and s["start"] + duration_td <= end_dt
-        ]
-        intervals: List[dict] = []
-
-        if continuous:
-            best_avg = None
-            best_window = None
-            for s0 in candidates:
-                t_end = s0 + duration_td
-                wparts: List[dict] = []
-                covered = 0.0
-                for seg in segs:
-                    if seg["end"] <= s0:
-                        continue
-                    if seg["start"] >= t_end:
-                        break
-                    ss = max(seg["start"], s0)
-                    ee = min(seg["end"], t_end)
-                    if ee > ss:
-                        wparts.append({"start": ss, "end": ee, "price": seg["price"]})
-                        covered += (ee - ss).total_seconds()
-                    if covered + 1e-6 >= duration_td.total_seconds():
-                        break
-                if covered + 1e-6 < duration_td.total_seconds():
-                    continue
-                avg = self._time_weighted_avg(wparts)
-                if avg is None:
-                    continue
-                if best_avg is None or avg < best_avg:
-                    best_avg = avg
-                    best_window = (s0, t_end, wparts)
-            if best_window:
-                s0, t_end, wparts = best_window
-                intervals = [
-                    {
-                        "start": s0,
-                        "end": t_end,
-                        "average": self._time_weighted_avg(wparts),
-                    }
-                ]
-        else:
-            need = duration_td.total_seconds()
-            segs_sorted = sorted(segs, key=lambda x: (x["price"], x["start"]))
-            picks: List[dict] = []
-            for seg in segs_sorted:
-                if need <= 0:
-                    break
-                seg_len = (seg["end"] - seg["start"]).total_seconds()
-                if seg_len <= 0:
-                    continue
-                take = min(need, seg_len)
-                picks.append(
-                    {
-                        "start": seg["start"],
-                        "end": seg["start"] + timedelta(seconds=take),
-                        "price": seg["price"],
-                    }
+        now_ts = now_local.timestamp()
+        with stats.stage("search"):
+            ranking = self._get_ranking(items_all, segs)
+            current_price = price_at(items_all, now_ts)
+            cutoff: Optional[float] = None
+            if self._mode == MODE_PERCENTILE:
+                cutoff = ranking.percentile(self._percentile / 100)
+            elif self._mode == MODE_THRESHOLD:
+                cutoff = self._threshold
+
+            if plan_entry is not None:
+                intervals = list(plan_entry[2])
+            elif self._mode in (MODE_WINDOW, MODE_PROFILE):
+                intervals = await self._select_window(
+                    items_all, segs, start_dt, end_dt, duration_td, bool(continuous)
                 )
-                need -= take
-            if picks:
-                picks.sort(key=lambda x: x["start"])
-                group: List[dict] = []
-                for p in picks:
-                    if not group:
-                        group = [p]
-                        continue
-                    prev = group[-1]
-                    if p["start"] == prev["end"] and p["price"] == prev["price"]:
-                        group[-1] = {
-                            "start": prev["start"],
-                            "end": p["end"],
-                            "price": prev["price"],
-                        }
-                    elif p["start"] == prev["end"]:
-                        group.append(p)
-                    else:
-                        avg = self._time_weighted_avg(group)
-                        intervals.append(
-                            {
-                                "start": group[0]["start"],
-                                "end": group[-1]["end"],
-                                "average": avg,
-                            }
-                        )
-                        group = [p]
-                if group:
-                    avg = self._time_weighted_avg(group)
-                    intervals.append(
-                        {
-                            "start": group[0]["start"],
-                            "end": group[-1]["end"],
-                            "average": avg,
-                        }
-                    )
-
-        active = any(i["start"] <= now_local < i["end"] for i in intervals)
+            elif cutoff is not None:
+                intervals = intervals_at_or_below(segs, cutoff)
+            else:
+                intervals = []
+        stats.intervals = len(intervals)
+
+        active = any(s <= now_ts < e for s, e, _ in intervals)
 
         next_start = None
-        future_starts = [i["start"] for i in intervals if i["start"] > now_local]
+        future_starts = [s for s, _, _ in intervals if s > now_ts]
         if future_starts:
             next_start = min(future_starts)
 
-        total_sec = sum((i["end"] - i["start"]).total_seconds() for i in intervals)
-        weighted_avg = None
-        if total_sec > 0:
-            weighted_avg = (
-                sum(
-                    i["average"] * (i["end"] - i["start"]).total_seconds()
-                    for i in intervals
-                )
-                / total_sec
-            )
+        weighted_avg = intervals_average(intervals)
+        rank = ranking.rank(current_price) if current_price is not None else None
 
-        self._attr_is_on = active
-        self._attr_extra_state_attributes = {
-            ATTR_INTERVALS: [
-                {
-                    "start": dt_util.as_local(i["start"]).isoformat(),
-                    "end": dt_util.as_local(i["end"]).isoformat(),
-                    "average": i["average"],
-                }
-                for i in intervals
-            ],
+        attrs = {
             ATTR_START_TIME: start_dt.isoformat(),
             ATTR_END_TIME: end_dt.isoformat(),
             ATTR_DURATION: duration_td.total_seconds() / 3600,
             ATTR_CONTINUOUS: bool(continuous),
             ATTR_NEXT_START_TIME: (
-                dt_util.as_local(next_start).isoformat() if next_start else None
+                to_local(next_start).isoformat()
+                if next_start is not None
+                else None
             ),
             ATTR_AVERAGE: weighted_avg,
+            ATTR_MODE: self._mode,
+            ATTR_CURRENT_PRICE: current_price,
+            ATTR_PRICE_RANK: round(rank * 100, 2) if rank is not None else None,
             ATTR_LAST_CALCULATED: now_local.isoformat(),
         }
+        self._add_interval_attrs(attrs, intervals, now_ts)
+        if self._mode == MODE_PROFILE:
+            energy = sum(self._profile) * self._profile_step / 3600
+            attrs[ATTR_ENERGY] = energy
+            attrs[ATTR_COST] = (
+                weighted_avg * energy if weighted_avg is not None else None
+            )
+        if cutoff is not None:
+            attrs[ATTR_CUTOFF_PRICE] = cutoff
+            attrs[ATTR_HOURS_AT_OR_BELOW] = ranking.time_at_or_below(cutoff) / 3600
+        self._schedule_wakeup(
+            self._wakeup_points(segs, intervals, start_dt, end_dt, now_local), now_ts
+        )
+        with stats.stage("write"):
+            self._publish(active, attrs, intervals, weighted_avg, now_local)
+
+    def _add_interval_attrs(
+        self, attrs: Dict[str, Any], intervals: List[Interval], now_ts: float
+    ) -> None:
+        """Add as much of the intervals and plan as the attribute setting
+        allows; summary leaves both to get_intervals."""
+        if self._attributes == ATTRIBUTES_FULL:
+            attrs[ATTR_INTERVALS] = format_intervals(intervals)
+            if self._planning:
+                attrs[ATTR_PLAN] = self._format_plan(now_ts)
+        elif self._attributes == ATTRIBUTES_NEXT:
+            upcoming = [iv for iv in intervals if iv[1] > now_ts]
+            attrs[ATTR_INTERVALS] = format_intervals(upcoming[: self._max_intervals])
+
+    async def async_get_intervals(self) -> ServiceResponse:
+        """Response of the get_intervals service."""
+        response: Dict[str, Any] = {
+            ATTR_INTERVALS: format_intervals(self._intervals),
+            ATTR_AVERAGE: intervals_average(self._intervals),
+            # The time of the latest calculation, even when write_on_change_only
+            # kept it out of the state.
+            ATTR_LAST_CALCULATED: (
+                self._last_calculated.isoformat() if self._last_calculated else None
+            ),
+        }
+        if self._planning:
+            response[ATTR_PLAN] = self._format_plan(dt_util.utcnow().timestamp())
+        return response
+
+    def _update_events(self, intervals: List[Interval]) -> None:
+        """Publish the current and planned windows to the calendar."""
+        events: Tuple[Interval, ...] = tuple(intervals)
+        if self._planning and self._plan:
+            events = tuple(iv for entry in self._plan for iv in entry[2])
+        if events == self._events:
+            return
+        self._events = events
+        self.hass.data.setdefault(DOMAIN, {}).setdefault(DATA_EVENTS, {})[
+            self._entry.entry_id
+        ] = IntervalIndex(events)
+        async_dispatcher_send(
+            self.hass, SIGNAL_EVENTS_UPDATED.format(self._entry.entry_id)
+        )
+
+    def _get_ranking(self, items_all: PriceSeries, segs: PriceSeries) -> PriceRanking:
+        # Rebuilt only when the timeline or the set of segments in the range
+        # changes; every percentile/rank query is then a bisect.
+        key = (items_all, segs.starts[0], segs.ends[-1])
+        if self._ranking is None or self._ranking_key != key:
+            self._ranking = PriceRanking(segs)
+            self._ranking_key = key
+        return self._ranking
+
+    async def _current_plan_entry(
+        self,
+        items_all: PriceSeries,
+        start_val: Any,
+        end_val: Any,
+        duration_td: timedelta,
+        continuous: bool,
+        now_local: datetime,
+    ) -> Optional[PlanEntry]:
+        """The planned day that has not ended yet, replanning only when the
+        timeline or the window settings change."""
+        now_ts = now_local.timestamp()
+        constraints = None if continuous else self._constraints
+        settings = (start_val, end_val, duration_td, continuous, constraints)
+        plan_key = (items_all, settings)
+        if self._plan_key != plan_key:
+            # Days already in progress keep their plan unless the settings
+            # changed; new prices only plan the days still ahead.
+            keep: Dict[float, PlanEntry] = {}
+            same_settings = self._plan_restored or (
+                self._plan_key is not None and self._plan_key[1] == settings
+            )
+            self._plan_restored = False
+            if same_settings:
+                keep = {e[1]: e for e in self._plan if e[0] <= now_ts < e[1]}
+            ranges = day_ranges(
+                start_val,
+                end_val,
+                now_local,
+                items_all.start(0),
+                items_all.end(len(items_all) - 1),
+            )
+            todo = [
+                (max(s.timestamp(), now_ts), e.timestamp())
+                for s, e in ranges
+                if e.timestamp() not in keep
+            ]
+            duration = duration_td.total_seconds()
+            args = (items_all, todo, duration, continuous, constraints)
+            if len(items_all) >= OFFLOAD_MIN_SEGMENTS:
+                planned = await async_run_offloaded(
+                    self.hass,
+                    self._executor == EXECUTOR_PROCESS,
+                    plan_windows,
+                    *args,
+                )
+            else:
+                planned = plan_windows(*args)
+            self._plan = sorted([*keep.values(), *planned], key=lambda x: x[0])
+            self._plan_key = plan_key
+            self._stats.index_builds += 1
+        for entry in self._plan:
+            if entry[1] > now_ts:
+                return entry
+        return None
+
+    def _format_plan(self, now_ts: float) -> List[Dict[str, Any]]:
+        return [
+            {
+                ATTR_START_TIME: to_local(r0).isoformat(),
+                ATTR_END_TIME: to_local(r1).isoformat(),
+                ATTR_INTERVALS: format_intervals(intervals),
+                ATTR_AVERAGE: intervals_average(intervals),
+            }
+            for r0, r1, intervals in self._plan
+            if r1 > now_ts
+        ]
+
+    async def _select_window(
+        self,
+        items_all: PriceSeries,
+        segs: PriceSeries,
+        start_dt: datetime,
+        end_dt: datetime,
+        duration_td: timedelta,
+        continuous: bool,
+    ) -> List[Interval]:
+        duration = duration_td.total_seconds()
+        end_ts = end_dt.timestamp()
+        builder: Callable[..., WindowIndex]
+        if self._mode == MODE_PROFILE:
+            builder = ProfileIndex
+            args: Tuple[Any, ...] = (
+                items_all,
+                end_ts,
+                self._profile,
+                self._profile_step,
+            )
+        else:
+            constraints = None if continuous else self._constraints
+            builder = build_index
+            args = (items_all, end_ts, duration, continuous, constraints)
+        index_key = (builder, *args)
+        if self._index is None or self._index_key != index_key:
+            # Only a new timeline, range end, duration or mode needs a
+            # rebuild; a moving range start is answered by the index.
+            if len(segs) >= OFFLOAD_MIN_SEGMENTS:
+                self._index = await async_run_offloaded(
+                    self.hass,
+                    self._executor == EXECUTOR_PROCESS,
+                    builder,
+                    *args,
+                )
+            else:
+                self._index = builder(*args)
+            self._index_key = index_key
+            self._stats.index_builds += 1
+        return self._index.select(start_dt.timestamp())
+
+    def _publish(
+        self,
+        is_on: bool,
+        attrs: Dict[str, Any],
+        intervals: List[Interval],
+        average: Optional[float],
+        now_local: datetime,
+    ) -> None:
+        self._last_calculated = now_local
+        self._intervals = intervals
+        self._update_events(intervals)
+        result = (is_on, tuple(intervals), average, attrs.get(ATTR_CURRENT_PRICE))
+        if self._write_on_change_only and result == self._last_result:
+            return
+        self._last_result = result
+        self._attr_is_on = is_on
+        self._attr_extra_state_attributes = attrs
         self.async_write_ha_state()
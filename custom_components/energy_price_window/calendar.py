@@ -0,0 +1,88 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import List, Optional
+
+from homeassistant.components.calendar import CalendarEntity, CalendarEvent
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_NAME,
+    DATA_EVENTS,
+    DEFAULT_NAME,
+    DOMAIN,
+    SIGNAL_EVENTS_UPDATED,
+)
+from .core import Interval, IntervalIndex
+from .util import to_local
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities
+) -> None:
+    async_add_entities([PriceWindowCalendar(hass, entry)])
+
+
+class PriceWindowCalendar(CalendarEntity):
+    """Current and planned windows of the entry's binary sensor as events.
+
+    Events are served from the IntervalIndex the sensor publishes, so
+    range queries never read the state machine.
+    """
+
+    _attr_should_poll = False
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self._entry = entry
+        data = {**entry.data, **(entry.options or {})}
+        self._attr_name = data.get(CONF_NAME) or DEFAULT_NAME
+        self._attr_unique_id = f"{entry.entry_id}_calendar"
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_EVENTS_UPDATED.format(self._entry.entry_id),
+                self._handle_update,
+            )
+        )
+
+    @callback
+    def _handle_update(self) -> None:
+        self.async_write_ha_state()
+
+    def _index(self) -> Optional[IntervalIndex]:
+        return self.hass.data.get(DOMAIN, {}).get(DATA_EVENTS, {}).get(
+            self._entry.entry_id
+        )
+
+    def _event(self, interval: Interval) -> CalendarEvent:
+        s, e, avg = interval
+        return CalendarEvent(
+            start=to_local(s),
+            end=to_local(e),
+            summary=self._attr_name,
+            description=f"Average price: {avg}" if avg is not None else None,
+        )
+
+    @property
+    def event(self) -> Optional[CalendarEvent]:
+        index = self._index()
+        if index is None:
+            return None
+        interval = index.current_or_next(dt_util.utcnow().timestamp())
+        return self._event(interval) if interval is not None else None
+
+    async def async_get_events(
+        self, hass: HomeAssistant, start_date: datetime, end_date: datetime
+    ) -> List[CalendarEvent]:
+        index = self._index()
+        if index is None:
+            return []
+        return [
+            self._event(iv)
+            for iv in index.overlapping(start_date.timestamp(), end_date.timestamp())
+        ]
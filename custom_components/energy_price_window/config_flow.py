@@ -14,11 +14,90 @@ from .const import (
     CONF_END_TIME,
     CONF_DURATION,
     CONF_CONTINUOUS,
+    CONF_WRITE_ON_CHANGE_ONLY,
+    CONF_DEBOUNCE_MS,
+    CONF_EXECUTOR,
+    CONF_MIN_BLOCK,
+    CONF_MAX_BLOCKS,
+    CONF_MIN_GAP,
+    CONF_MODE,
+    CONF_PERCENTILE,
+    CONF_PLANNING,
+    CONF_LOAD_PROFILE,
+    CONF_PROFILE_STEP,
+    CONF_THRESHOLD,
+    CONF_ATTRIBUTES,
+    CONF_MAX_INTERVALS,
+    ATTRIBUTES_FULL,
+    ATTRIBUTES_NEXT,
+    ATTRIBUTES_SUMMARY,
     DEFAULT_NAME,
     DEFAULT_START_TIME,
     DEFAULT_END_TIME,
     DEFAULT_DURATION,
     DEFAULT_CONTINUOUS,
+    DEFAULT_WRITE_ON_CHANGE_ONLY,
+    DEFAULT_DEBOUNCE_MS,
+    DEFAULT_EXECUTOR,
+    DEFAULT_MAX_BLOCKS,
+    DEFAULT_MODE,
+    DEFAULT_PERCENTILE,
+    DEFAULT_PLANNING,
+    DEFAULT_PROFILE_STEP,
+    DEFAULT_ATTRIBUTES,
+    DEFAULT_MAX_INTERVALS,
+    EXECUTOR_PROCESS,
+    EXECUTOR_THREAD,
+    MODE_PERCENTILE,
+    MODE_PROFILE,
+    MODE_THRESHOLD,
+    MODE_WINDOW,
+)
+
+DEBOUNCE_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=0,
+        max=5000,
+        step=50,
+        unit_of_measurement="ms",
+        mode=selector.NumberSelectorMode.BOX,
+    )
+)
+EXECUTOR_SELECTOR = selector.SelectSelector(
+    selector.SelectSelectorConfig(options=[EXECUTOR_THREAD, EXECUTOR_PROCESS])
+)
+MODE_SELECTOR = selector.SelectSelector(
+    selector.SelectSelectorConfig(
+        options=[MODE_WINDOW, MODE_PERCENTILE, MODE_THRESHOLD, MODE_PROFILE]
+    )
+)
+PERCENTILE_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=1,
+        max=100,
+        step=1,
+        unit_of_measurement="%",
+        mode=selector.NumberSelectorMode.BOX,
+    )
+)
+THRESHOLD_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(step="any", mode=selector.NumberSelectorMode.BOX)
+)
+# ConstrainedIndex costs time and memory in proportion to the block limit.
+MAX_BLOCKS_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=0, max=12, step=1, mode=selector.NumberSelectorMode.BOX
+    )
+)
+ATTRIBUTES_SELECTOR = selector.SelectSelector(
+    selector.SelectSelectorConfig(
+        options=[ATTRIBUTES_SUMMARY, ATTRIBUTES_NEXT, ATTRIBUTES_FULL]
+    )
+)
+MAX_INTERVALS_SELECTOR = selector.NumberSelector(
+    selector.NumberSelectorConfig(
+        min=1, max=96, step=1, mode=selector.NumberSelectorMode.BOX
+    )
 )
 
 # Create flow schema:
@@ -37,10 +116,34 @@ DATA_SCHEMA = vol.Schema(
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): selector.TextSelector(),
         vol.Optional(CONF_START_TIME, default=""): selector.TextSelector(),
         vol.Optional(CONF_END_TIME, default=""): selector.TextSelector(),
+        vol.Optional(CONF_MODE, default=DEFAULT_MODE): MODE_SELECTOR,
         vol.Required(CONF_DURATION, default=DEFAULT_DURATION): selector.TextSelector(),
         vol.Optional(
             CONF_CONTINUOUS, default=DEFAULT_CONTINUOUS
         ): selector.BooleanSelector(),
+        vol.Optional(
+            CONF_PLANNING, default=DEFAULT_PLANNING
+        ): selector.BooleanSelector(),
+        vol.Optional(CONF_ATTRIBUTES, default=DEFAULT_ATTRIBUTES): ATTRIBUTES_SELECTOR,
+        vol.Optional(
+            CONF_MAX_INTERVALS, default=DEFAULT_MAX_INTERVALS
+        ): MAX_INTERVALS_SELECTOR,
+        vol.Optional(
+            CONF_WRITE_ON_CHANGE_ONLY, default=DEFAULT_WRITE_ON_CHANGE_ONLY
+        ): selector.BooleanSelector(),
+        vol.Optional(CONF_DEBOUNCE_MS, default=DEFAULT_DEBOUNCE_MS): DEBOUNCE_SELECTOR,
+        vol.Optional(CONF_EXECUTOR, default=DEFAULT_EXECUTOR): EXECUTOR_SELECTOR,
+        vol.Optional(CONF_MIN_BLOCK, default=""): selector.TextSelector(),
+        vol.Optional(
+            CONF_MAX_BLOCKS, default=DEFAULT_MAX_BLOCKS
+        ): MAX_BLOCKS_SELECTOR,
+        vol.Optional(CONF_MIN_GAP, default=""): selector.TextSelector(),
+        vol.Optional(CONF_PERCENTILE, default=DEFAULT_PERCENTILE): PERCENTILE_SELECTOR,
+        vol.Optional(CONF_THRESHOLD): THRESHOLD_SELECTOR,
+        vol.Optional(CONF_LOAD_PROFILE, default=""): selector.TextSelector(),
+        vol.Optional(
+            CONF_PROFILE_STEP, default=DEFAULT_PROFILE_STEP
+        ): selector.TextSelector(),
     }
 )
 
@@ -127,6 +230,9 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(
                     CONF_END_TIME, default=str(data.get(CONF_END_TIME, "") or "")
                 ): selector.TextSelector(),
+                vol.Optional(
+                    CONF_MODE, default=data.get(CONF_MODE, DEFAULT_MODE)
+                ): MODE_SELECTOR,
                 vol.Required(
                     CONF_DURATION,
                     default=str(data.get(CONF_DURATION, DEFAULT_DURATION)),
@@ -135,6 +241,64 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_CONTINUOUS,
                     default=bool(data.get(CONF_CONTINUOUS, DEFAULT_CONTINUOUS)),
                 ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_PLANNING,
+                    default=bool(data.get(CONF_PLANNING, DEFAULT_PLANNING)),
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_ATTRIBUTES,
+                    default=data.get(CONF_ATTRIBUTES, DEFAULT_ATTRIBUTES),
+                ): ATTRIBUTES_SELECTOR,
+                vol.Optional(
+                    CONF_MAX_INTERVALS,
+                    default=data.get(CONF_MAX_INTERVALS, DEFAULT_MAX_INTERVALS),
+                ): MAX_INTERVALS_SELECTOR,
+                vol.Optional(
+                    CONF_WRITE_ON_CHANGE_ONLY,
+                    default=bool(
+                        data.get(
+                            CONF_WRITE_ON_CHANGE_ONLY, DEFAULT_WRITE_ON_CHANGE_ONLY
+                        )
+                    ),
+                ): selector.BooleanSelector(),
+                vol.Optional(
+                    CONF_DEBOUNCE_MS,
+                    default=data.get(CONF_DEBOUNCE_MS, DEFAULT_DEBOUNCE_MS),
+                ): DEBOUNCE_SELECTOR,
+                vol.Optional(
+                    CONF_EXECUTOR,
+                    default=data.get(CONF_EXECUTOR, DEFAULT_EXECUTOR),
+                ): EXECUTOR_SELECTOR,
+                vol.Optional(
+                    CONF_MIN_BLOCK, default=str(data.get(CONF_MIN_BLOCK, "") or "")
+                ): selector.TextSelector(),
+                vol.Optional(
+                    CONF_MAX_BLOCKS,
+                    default=data.get(CONF_MAX_BLOCKS, DEFAULT_MAX_BLOCKS),
+                ): MAX_BLOCKS_SELECTOR,
+                vol.Optional(
+                    CONF_MIN_GAP, default=str(data.get(CONF_MIN_GAP, "") or "")
+                ): selector.TextSelector(),
+                vol.Optional(
+                    CONF_PERCENTILE,
+                    default=data.get(CONF_PERCENTILE, DEFAULT_PERCENTILE),
+                ): PERCENTILE_SELECTOR,
+                vol.Optional(
+                    CONF_THRESHOLD,
+                    default=(
+                        data[CONF_THRESHOLD]
+                        if data.get(CONF_THRESHOLD) is not None
+                        else vol.UNDEFINED
+                    ),
+                ): THRESHOLD_SELECTOR,
+                vol.Optional(
+                    CONF_LOAD_PROFILE,
+                    default=str(data.get(CONF_LOAD_PROFILE, "") or ""),
+                ): selector.TextSelector(),
+                vol.Optional(
+                    CONF_PROFILE_STEP,
+                    default=str(data.get(CONF_PROFILE_STEP, DEFAULT_PROFILE_STEP)),
+                ): selector.TextSelector(),
             }
         )
         return self.async_show_form(step_id="init", data_schema=schema)
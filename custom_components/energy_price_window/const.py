@@ -2,6 +2,12 @@ from __future__ import annotations
 
 DOMAIN = "energy_price_window"
 
+DATA_PRICE_STORE = "price_store"
+DATA_PROCESS_POOL = "process_pool"
+DATA_STATS = "stats"
+DATA_EVENTS = "events"
+DATA_HUB = "hub"
+
 CONF_SOURCE_ENTITY = "sensor_name"
 CONF_FORECAST_SOURCE_ENTITY = "forecast_source_entity"
 CONF_NAME = "name"
@@ -9,6 +15,20 @@ CONF_START_TIME = "start_time"
 CONF_END_TIME = "end_time"
 CONF_DURATION = "duration"
 CONF_CONTINUOUS = "continuous"
+CONF_WRITE_ON_CHANGE_ONLY = "write_on_change_only"
+CONF_DEBOUNCE_MS = "debounce_ms"
+CONF_EXECUTOR = "executor"
+CONF_MIN_BLOCK = "min_block"
+CONF_MAX_BLOCKS = "max_blocks"
+CONF_MIN_GAP = "min_gap"
+CONF_MODE = "mode"
+CONF_PERCENTILE = "percentile"
+CONF_THRESHOLD = "threshold"
+CONF_PLANNING = "planning"
+CONF_LOAD_PROFILE = "load_profile"
+CONF_PROFILE_STEP = "profile_step"
+CONF_ATTRIBUTES = "attributes"
+CONF_MAX_INTERVALS = "max_intervals"
 
 ATTR_INTERVALS = "intervals"
 ATTR_START_TIME = "start_time"
@@ -18,9 +38,65 @@ ATTR_CONTINUOUS = "continuous"
 ATTR_NEXT_START_TIME = "next_start_time"
 ATTR_AVERAGE = "average"
 ATTR_LAST_CALCULATED = "last_calculated"
+ATTR_SOURCE_ENTITY = "source_entity"
+ATTR_FORECAST_ENTITY = "forecast_entity"
+ATTR_WINDOWS = "windows"
+ATTR_MODE = "mode"
+ATTR_CURRENT_PRICE = "current_price"
+ATTR_PRICE_RANK = "price_rank"
+ATTR_CUTOFF_PRICE = "cutoff_price"
+ATTR_HOURS_AT_OR_BELOW = "hours_at_or_below"
+ATTR_PLAN = "plan"
+ATTR_COST = "cost"
+ATTR_ENERGY = "energy"
+
+SERVICE_COMPUTE_WINDOWS = "compute_windows"
+SERVICE_GET_INTERVALS = "get_intervals"
+SERVICE_FIND_WINDOW = "find_window"
+
+STORAGE_KEY = DOMAIN + ".series"
+STORAGE_VERSION = 1
+# Parsed series are written at most this often (seconds).
+STORAGE_SAVE_DELAY = 60
+
+# Sent with the entry id when the windows behind the calendar change.
+SIGNAL_EVENTS_UPDATED = DOMAIN + "_events_updated_{}"
 
 DEFAULT_NAME = "Price Window"
 DEFAULT_START_TIME: str | None = None  # -> defaults to now()
 DEFAULT_END_TIME: str | None = None  # -> defaults to dataset end
 DEFAULT_DURATION = "3:00"
 DEFAULT_CONTINUOUS = True
+DEFAULT_WRITE_ON_CHANGE_ONLY = False
+DEFAULT_DEBOUNCE_MS = 250
+DEFAULT_MAX_BLOCKS = 0  # -> unlimited
+DEFAULT_PERCENTILE = 25
+DEFAULT_PLANNING = False
+DEFAULT_PROFILE_STEP = "0:05"
+DEFAULT_MAX_INTERVALS = 3
+
+# window: cheapest `duration` of the range
+# percentile: every slot within the cheapest `percentile` % of the range
+# threshold: every slot priced at or below `threshold`
+# profile: cheapest run of an appliance drawing `load_profile` kW per step
+MODE_WINDOW = "window"
+MODE_PERCENTILE = "percentile"
+MODE_THRESHOLD = "threshold"
+MODE_PROFILE = "profile"
+DEFAULT_MODE = MODE_WINDOW
+
+# How much of the windows goes into the state attributes; the full list is
+# always available from the get_intervals service.
+# summary: no intervals or plan
+# next: the next `max_intervals` intervals, no plan
+# full: every interval and the plan
+ATTRIBUTES_SUMMARY = "summary"
+ATTRIBUTES_NEXT = "next"
+ATTRIBUTES_FULL = "full"
+DEFAULT_ATTRIBUTES = ATTRIBUTES_FULL
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+DEFAULT_EXECUTOR = EXECUTOR_THREAD
+# Recalculations over at least this many clipped segments run in an executor.
+OFFLOAD_MIN_SEGMENTS = 500
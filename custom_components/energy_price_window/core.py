@@ -0,0 +1,1046 @@
+"""Price window optimisation on plain epoch-second price series.
+
+Only the standard library is required here so the algorithms can be
+exercised and benchmarked without Home Assistant. When NumPy is importable
+the per-segment loops run vectorised through numpy_backend instead; both
+paths produce identical results.
+"""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left, bisect_right
+import math
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+try:
+    from . import numpy_backend as _np
+except ImportError:  # NumPy missing, or loaded outside the package
+    _np = None
+
+BACKEND = "python" if _np is None else "numpy"
+
+Segment = Tuple[float, float, float]
+Interval = Tuple[float, float, Optional[float]]
+
+
+class PriceSeries:
+    """Sorted, non-overlapping price intervals stored as parallel columns.
+
+    Times are epoch seconds. The columns are read-only, so one series can
+    be handed to every sensor. ``view`` and ``clip`` share the underlying
+    arrays; clipping only records the bounds applied to the first start and
+    the last end.
+    """
+
+    __slots__ = ("starts", "ends", "prices", "lower", "upper")
+
+    def __init__(
+        self,
+        starts: Sequence[float],
+        ends: Sequence[float],
+        prices: Sequence[float],
+        lower: Optional[float] = None,
+        upper: Optional[float] = None,
+    ) -> None:
+        self.starts = starts
+        self.ends = ends
+        self.prices = prices
+        self.lower = lower
+        self.upper = upper
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Segment]) -> PriceSeries:
+        starts = array("d")
+        ends = array("d")
+        prices = array("d")
+        for s, e, p in sorted(segments, key=lambda x: x[0]):
+            starts.append(s)
+            ends.append(e)
+            prices.append(p)
+        return _series_from_arrays(starts, ends, prices, None, None)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __bool__(self) -> bool:
+        return len(self.starts) > 0
+
+    def __iter__(self) -> Iterator[Segment]:
+        n = len(self.starts)
+        for i, (s, e, p) in enumerate(zip(self.starts, self.ends, self.prices)):
+            if i == 0 and self.lower is not None and s < self.lower:
+                s = self.lower
+            if i == n - 1 and self.upper is not None and e > self.upper:
+                e = self.upper
+            yield s, e, p
+
+    def start(self, i: int) -> float:
+        s = self.starts[i]
+        if i == 0 and self.lower is not None and s < self.lower:
+            return self.lower
+        return s
+
+    def end(self, i: int) -> float:
+        e = self.ends[i]
+        if i == len(self.ends) - 1 and self.upper is not None and e > self.upper:
+            return self.upper
+        return e
+
+    def view(self, lo: int, hi: int) -> PriceSeries:
+        lower = self.lower if lo == 0 else None
+        upper = self.upper if hi >= len(self.starts) else None
+        return PriceSeries(
+            self.starts[lo:hi], self.ends[lo:hi], self.prices[lo:hi], lower, upper
+        )
+
+    def __reduce__(self):
+        # memoryviews cannot be pickled; ship plain arrays to worker processes.
+        return (
+            _series_from_arrays,
+            (
+                array("d", self.starts),
+                array("d", self.ends),
+                array("d", self.prices),
+                self.lower,
+                self.upper,
+            ),
+        )
+
+    def clip(self, r0: float, r1: float) -> PriceSeries:
+        lo = bisect_right(self.ends, r0)
+        hi = bisect_left(self.starts, r1)
+        if hi < lo:
+            hi = lo
+        lower = r0 if self.lower is None else max(self.lower, r0)
+        upper = r1 if self.upper is None else min(self.upper, r1)
+        return PriceSeries(
+            self.starts[lo:hi], self.ends[lo:hi], self.prices[lo:hi], lower, upper
+        )
+
+
+def _series_from_arrays(
+    starts: array,
+    ends: array,
+    prices: array,
+    lower: Optional[float],
+    upper: Optional[float],
+) -> PriceSeries:
+    return PriceSeries(
+        memoryview(starts).toreadonly(),
+        memoryview(ends).toreadonly(),
+        memoryview(prices).toreadonly(),
+        lower,
+        upper,
+    )
+
+
+class WindowSearch:
+    """Prefix sums of price·seconds over a PriceSeries."""
+
+    def __init__(self, series: PriceSeries) -> None:
+        self.series = series
+        if _np is not None:
+            self._cum_cost, self._cum_cover = _np.prefix_sums(series)
+            return
+        cum_cost = [0.0]
+        cum_cover = [0.0]
+        cost = 0.0
+        cover = 0.0
+        for s, e, p in series:
+            d = e - s
+            if d > 0:
+                cost += p * d
+                cover += d
+            cum_cost.append(cost)
+            cum_cover.append(cover)
+        self._cum_cost = cum_cost
+        self._cum_cover = cum_cover
+
+    def integral(self, t: float) -> Tuple[float, float]:
+        """Return (price·seconds, covered seconds) from the first segment up to t."""
+        series = self.series
+        k = bisect_right(series.starts, t) - 1
+        if k < 0:
+            return 0.0, 0.0
+        d = min(t, series.end(k)) - series.start(k)
+        if d <= 0:
+            return self._cum_cost[k], self._cum_cover[k]
+        return self._cum_cost[k] + series.prices[k] * d, self._cum_cover[k] + d
+
+    def window(self, t0: float, t1: float) -> Tuple[float, float]:
+        c0, w0 = self.integral(t0)
+        c1, w1 = self.integral(t1)
+        return c1 - c0, w1 - w0
+
+    def cheapest(
+        self,
+        range_start: float,
+        range_end: float,
+        duration: float,
+        candidates: Optional[PriceSeries] = None,
+    ) -> Optional[Tuple[int, float]]:
+        """Index of the segment start that begins the cheapest fully covered
+        window of ``duration`` seconds inside the range, and its average.
+
+        Candidate starts come from ``candidates`` (a clipped view of the
+        searched series) when given, so one search can serve many ranges.
+        """
+        if candidates is None:
+            candidates = self.series
+        best_avg = None
+        best_idx = None
+        for i, avg in enumerate(
+            self._start_averages(candidates, range_start, range_end, duration)
+        ):
+            if avg is None:
+                continue
+            if best_avg is None or avg < best_avg - 1e-12 * abs(best_avg):
+                best_avg = avg
+                best_idx = i
+        if best_idx is None:
+            return None
+        return best_idx, best_avg
+
+    def _start_averages(
+        self,
+        candidates: PriceSeries,
+        range_start: float,
+        range_end: float,
+        duration: float,
+    ) -> List[Optional[float]]:
+        """Average of the window of ``duration`` at every candidate start;
+        None when it starts too early, ends too late or has gaps."""
+        if _np is not None:
+            return [
+                avg if ok else None
+                for avg, ok in _np.start_averages(
+                    self.series,
+                    candidates,
+                    self._cum_cost,
+                    self._cum_cover,
+                    duration,
+                    range_start,
+                    range_end,
+                )
+            ]
+        out: List[Optional[float]] = []
+        for i in range(len(candidates)):
+            s0 = candidates.start(i)
+            t_end = s0 + duration
+            if s0 < range_start or t_end > range_end:
+                out.append(None)
+                continue
+            cost, covered = self.window(s0, t_end)
+            if covered + 1e-6 < duration or covered <= 0:
+                out.append(None)
+                continue
+            out.append(cost / covered)
+        return out
+
+    def grid_windows(
+        self, origin: float, step: float, first: int, last: int
+    ) -> Tuple[List[float], List[float]]:
+        """(cost, covered) of every slot [origin + j*step, +step) for j in
+        [first, last)."""
+        if _np is not None:
+            return _np.grid_windows(
+                self.series,
+                self._cum_cost,
+                self._cum_cover,
+                origin,
+                step,
+                first,
+                last,
+            )
+        costs: List[float] = []
+        covers: List[float] = []
+        for j in range(first, last):
+            t0 = origin + j * step
+            cost, covered = self.window(t0, t0 + step)
+            costs.append(cost)
+            covers.append(covered)
+        return costs, covers
+
+
+def price_order(series: PriceSeries) -> List[int]:
+    """Segment indices by (price, start)."""
+    if _np is not None:
+        return _np.price_order(series)
+    starts = series.starts
+    prices = series.prices
+    return sorted(range(len(series)), key=lambda i: (prices[i], starts[i]))
+
+
+def cheapest_window(
+    series: PriceSeries, range_start: float, range_end: float, duration: float
+) -> Optional[Tuple[int, float]]:
+    return WindowSearch(series).cheapest(range_start, range_end, duration)
+
+
+def merge_overlaps(intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    if not intervals:
+        return []
+    ints = sorted(intervals, key=lambda x: x[0])
+    out = []
+    cs, ce = ints[0]
+    for s, e in ints[1:]:
+        if s <= ce:
+            if e > ce:
+                ce = e
+        else:
+            out.append((cs, ce))
+            cs, ce = s, e
+    out.append((cs, ce))
+    return out
+
+
+def merge_forecast(primary: PriceSeries, forecast: PriceSeries) -> PriceSeries:
+    """Fill the gaps in ``primary`` with the parts of ``forecast`` it does not cover.
+
+    Both series are sorted, so a single sweep over the merged primary
+    coverage and the forecast suffices; once the forecast passes the last
+    primary interval the remainder is copied as is.
+    """
+    if not forecast:
+        return primary
+    blockers = merge_overlaps(list(zip(primary.starts, primary.ends)))
+    nb = len(blockers)
+    parts: List[Segment] = []
+    j = 0
+    n = len(forecast)
+    for i in range(n):
+        fs = forecast.start(i)
+        fe = forecast.end(i)
+        fp = forecast.prices[i]
+        while j < nb and blockers[j][1] <= fs:
+            j += 1
+        if j == nb:
+            parts.extend(forecast.view(i, n))
+            break
+        s = fs
+        k = j
+        while k < nb and s < fe:
+            bs, be = blockers[k]
+            if bs >= fe:
+                break
+            if bs > s:
+                parts.append((s, bs, fp))
+            if be > s:
+                s = be
+            k += 1
+        if s < fe:
+            parts.append((s, fe, fp))
+    if not parts:
+        return primary
+    # Both runs are already ordered, so the sort in from_segments is linear.
+    return PriceSeries.from_segments([*primary, *parts])
+
+
+def time_weighted_avg(segs: Iterable[Segment]) -> Optional[float]:
+    total = 0.0
+    w = 0.0
+    for s, e, p in segs:
+        d = e - s
+        if d <= 0:
+            continue
+        total += p * d
+        w += d
+    if w <= 0:
+        return None
+    return total / w
+
+
+def window_interval(segs: PriceSeries, s0: float, duration: float) -> Interval:
+    t_end = s0 + duration
+    wparts: List[Segment] = []
+    for i in range(max(bisect_right(segs.starts, s0) - 1, 0), len(segs)):
+        ss = max(segs.start(i), s0)
+        if ss >= t_end:
+            break
+        ee = min(segs.end(i), t_end)
+        if ee > ss:
+            wparts.append((ss, ee, segs.prices[i]))
+    return (s0, t_end, time_weighted_avg(wparts))
+
+
+def group_picks(picks: List[Segment]) -> List[Interval]:
+    intervals: List[Interval] = []
+    if not picks:
+        return intervals
+    picks.sort(key=lambda x: x[0])
+    group: List[Segment] = []
+    for p in picks:
+        if not group:
+            group = [p]
+            continue
+        prev = group[-1]
+        if p[0] == prev[1] and p[2] == prev[2]:
+            group[-1] = (prev[0], p[1], prev[2])
+        elif p[0] == prev[1]:
+            group.append(p)
+        else:
+            intervals.append((group[0][0], group[-1][1], time_weighted_avg(group)))
+            group = [p]
+    if group:
+        intervals.append((group[0][0], group[-1][1], time_weighted_avg(group)))
+    return intervals
+
+
+class ContinuousIndex:
+    """Cheapest continuous window for a fixed timeline, range end and duration.
+
+    The average of the window starting at every segment start is computed
+    once, together with a suffix minimum, so moving the range start forward
+    (the usual case: "now" advancing) only moves a pointer.
+    """
+
+    def __init__(self, series: PriceSeries, range_end: float, duration: float):
+        segs = series.clip(float("-inf"), range_end)
+        self.segs = segs
+        self.range_end = range_end
+        self.duration = duration
+        self._search = WindowSearch(segs)
+        n = len(segs)
+        avgs = array("d", [0.0]) * n
+        best_from = array("l", [-1]) * (n + 1)
+        best = -1
+        window_avgs = self._search._start_averages(
+            segs, float("-inf"), range_end, duration
+        )
+        for i in range(n - 1, -1, -1):
+            avg = window_avgs[i]
+            if avg is not None:
+                avgs[i] = avg
+                if best < 0 or avg <= avgs[best] + 1e-12 * abs(avgs[best]):
+                    best = i
+            best_from[i] = best
+        self._avgs = avgs
+        self._best_from = best_from
+        self._pos = 0
+        self._pos_start = float("-inf")
+
+    def _window_avg(self, s0: float) -> Optional[float]:
+        t_end = s0 + self.duration
+        if t_end > self.range_end:
+            return None
+        cost, covered = self._search.window(s0, t_end)
+        if covered + 1e-6 < self.duration or covered <= 0:
+            return None
+        return cost / covered
+
+    def _first_start_at_or_after(self, range_start: float) -> int:
+        lo = self._pos if range_start >= self._pos_start else 0
+        pos = bisect_left(self.segs.starts, range_start, lo)
+        if pos == 1 and self.segs.start(0) >= range_start:
+            # Only the first start can be raised by a clip bound.
+            pos = 0
+        self._pos = pos
+        self._pos_start = range_start
+        return self._pos
+
+    def select(self, range_start: float) -> List[Interval]:
+        segs = self.segs
+        i0 = self._first_start_at_or_after(range_start)
+        best_start = None
+        best_avg = None
+        k = i0 - 1
+        if k >= 0 and segs.start(k) < range_start < segs.end(k):
+            # The range starts inside a segment: that partial start is the
+            # earliest candidate and is not part of the precomputed index.
+            best_avg = self._window_avg(range_start)
+            if best_avg is not None:
+                best_start = range_start
+        if i0 < len(segs):
+            j = self._best_from[i0]
+            if j >= 0:
+                avg = self._avgs[j]
+                if best_avg is None or avg < best_avg - 1e-12 * abs(best_avg):
+                    best_start = segs.start(j)
+                    best_avg = avg
+        if best_start is None:
+            return []
+        return [window_interval(segs, best_start, self.duration)]
+
+
+class SlotIndex:
+    """Cheapest (possibly split) slots for a fixed timeline, range end and
+    duration. Segments are sorted by price once; a later range start only
+    skips the expired ones."""
+
+    def __init__(self, series: PriceSeries, range_end: float, duration: float):
+        segs = series.clip(float("-inf"), range_end)
+        self.segs = segs
+        self.duration = duration
+        self._order = price_order(segs)
+
+    def select(self, range_start: float) -> List[Interval]:
+        segs = self.segs
+        need = self.duration
+        picks: List[Segment] = []
+        for i in self._order:
+            if need <= 0:
+                break
+            e = segs.end(i)
+            if e <= range_start:
+                continue
+            s = max(segs.start(i), range_start)
+            seg_len = e - s
+            if seg_len <= 0:
+                continue
+            take = min(need, seg_len)
+            picks.append((s, s + take, segs.prices[i]))
+            need -= take
+        return group_picks(picks)
+
+
+class BlockConstraints(NamedTuple):
+    """Limits on how a non-continuous selection may be split (seconds)."""
+
+    min_block: float = 0.0
+    max_blocks: int = 0  # 0 = unlimited
+    min_gap: float = 0.0
+
+
+class ConstrainedIndex:
+    """Cheapest non-continuous selection honouring BlockConstraints.
+
+    The range is cut into slots of the shortest segment length, aligned to
+    the timeline. A dynamic programme runs backwards from the range end
+    over (slots still needed, blocks still allowed), with slots either
+    "free" (a block may start) or "in block" (its minimum length already
+    met), so every transition is O(1). Without a block limit the blocks
+    dimension is dropped: O(N·M) for N slots and M slots needed, O(N·K·M)
+    time and memory with at most K blocks, which is why the options cap K.
+    The programme runs once per index and keeps only one decision byte per
+    state; a later range start only replays the decisions from its first
+    slot, in O(N). A minimum block longer than the duration asks for the
+    whole duration in one block.
+    """
+
+    def __init__(
+        self,
+        series: PriceSeries,
+        range_end: float,
+        duration: float,
+        constraints: BlockConstraints,
+    ):
+        segs = series.clip(float("-inf"), range_end)
+        self.segs = segs
+        self.range_end = range_end
+        self.duration = duration
+        self.constraints = constraints
+        step = 0.0
+        for s, e in zip(segs.starts, segs.ends):
+            d = e - s
+            if d > 0 and (step <= 0 or d < step):
+                step = d
+        self.step = step
+        self.origin = segs.starts[0] if segs else 0.0
+        self._free_dec: List[bytes] = []
+        self._busy_dec: List[bytes] = []
+        self._free_cost: List[float] = []
+        self._target = 0
+        self._width = 1
+        self._offset = 1
+        self._need = 0
+        self._run = 1
+        self._gap = 0
+        if step > 0 and duration > 0:
+            self._solve(WindowSearch(segs))
+
+    def _solve(self, search: WindowSearch) -> None:
+        c = self.constraints
+        step = self.step
+        n = math.floor((self.range_end - self.origin) / step + 1e-9)
+        need = math.ceil(self.duration / step - 1e-9)
+        run = min(need, max(1, math.ceil(c.min_block / step - 1e-9)))
+        gap = max(0, math.ceil(c.min_gap / step - 1e-9))
+        if n <= 0 or need > n:
+            return
+        self._need = need
+        self._run = run
+        self._gap = gap
+        costs, covers = search.grid_windows(self.origin, step, 0, n)
+        valid = [covered + 1e-6 >= step for covered in covers]
+
+        # run_cost[i] is the cost of slots i..i+run-1, None if any is invalid.
+        prefix = [0.0]
+        bad = [0]
+        for i in range(n):
+            prefix.append(prefix[-1] + (costs[i] if valid[i] else 0.0))
+            bad.append(bad[-1] + (0 if valid[i] else 1))
+        run_cost: List[Optional[float]] = [
+            prefix[i + run] - prefix[i] if bad[i + run] == bad[i] else None
+            for i in range(n - run + 1)
+        ]
+
+        # States are flattened as k * width + m: m slots still to pick with
+        # k more blocks allowed. Unlimited blocks keep a single k row.
+        width = need + 1
+        if c.max_blocks > 0:
+            k_max = min(c.max_blocks, need // run)
+            size = (k_max + 1) * width
+            offset = width + run
+            target = k_max * width + need
+        else:
+            size = width
+            offset = run
+            target = need
+        self._width = width
+        self._offset = offset
+        self._target = target
+        zero_at = range(0, size, width)
+        # A block cannot start with fewer than `run` slots still to pick.
+        too_short = [z + m for z in zero_at for m in range(1, run)]
+
+        inf = math.inf
+        none = [inf] * size
+        done = list(none)
+        for z in zero_at:
+            done[z] = 0.0
+        # free[i] / busy[i]: cheapest completion from slot boundary i. Only
+        # the rows still reachable from earlier boundaries are kept.
+        free: List[Optional[List[float]]] = [None] * (n + 1)
+        busy: List[Optional[List[float]]] = [None] * (n + 1)
+        free[n] = done
+        busy[n] = done
+        free_dec = [b""] * (n + 1)
+        busy_dec = [b""] * (n + 1)
+        free_cost = [inf] * (n + 1)
+        keep = max(gap, run, 1)
+        for i in range(n - 1, -1, -1):
+            # Free at i: leave slot i unused, or start a block of the
+            # minimum length there.
+            skip = free[i + 1]
+            rc = run_cost[i] if i + run <= n else None
+            if rc is not None:
+                src = busy[i + run]
+                start = none[:offset] + [v + rc for v in src[: size - offset]]
+                for p in too_short:
+                    start[p] = inf
+                fi = [a if a < b else b for a, b in zip(start, skip)]
+                free_dec[i] = bytes([a <= b for a, b in zip(start, skip)])
+            else:
+                fi = list(skip)
+                free_dec[i] = bytes(size)
+            for z in zero_at:
+                fi[z] = 0.0
+            free[i] = fi
+            free_cost[i] = fi[target]
+            # In block at i: extend it by slot i, or close it and stay free
+            # for the gap (a block may also end the selection).
+            close = free[i + gap] if i + gap <= n else none
+            if valid[i]:
+                ci = costs[i]
+                nxt = busy[i + 1]
+                extend = [inf] + [v + ci for v in nxt[: size - 1]]
+                bi = [a if a <= b else b for a, b in zip(extend, close)]
+                busy_dec[i] = bytes([b < a for a, b in zip(extend, close)])
+            else:
+                bi = list(close)
+                busy_dec[i] = bytes([1]) * size
+            for z in zero_at:
+                bi[z] = 0.0
+            busy[i] = bi
+            if i + keep + 1 <= n:
+                free[i + keep + 1] = None
+                busy[i + keep + 1] = None
+        self._free_dec = free_dec
+        self._busy_dec = busy_dec
+        self._free_cost = free_cost
+
+    def select(self, range_start: float) -> List[Interval]:
+        if not self._free_dec:
+            return []
+        step = self.step
+        first = max(0, math.ceil((range_start - self.origin) / step - 1e-9))
+        if first >= len(self._free_dec) - 1 or self._free_cost[first] == math.inf:
+            return []
+        chosen = self._replay(first)
+        blocks: List[Tuple[float, float]] = []
+        for j in chosen:
+            t0 = self.origin + j * step
+            if blocks and blocks[-1][1] == t0:
+                blocks[-1] = (blocks[-1][0], t0 + step)
+            else:
+                blocks.append((t0, t0 + step))
+        excess = self._need * step - self.duration
+        if excess > 1e-6:
+            s0, e0 = blocks[-1]
+            blocks[-1] = (s0, e0 - excess)
+        return [window_interval(self.segs, s0, e0 - s0) for s0, e0 in blocks]
+
+    def _replay(self, first: int) -> List[int]:
+        """Slots picked by the stored decisions starting free at ``first``."""
+        width = self._width
+        run = self._run
+        chosen: List[int] = []
+        i = first
+        idx = self._target
+        in_block = False
+        while idx % width:
+            if in_block:
+                if self._busy_dec[i][idx]:
+                    i += self._gap
+                    in_block = False
+                else:
+                    chosen.append(i)
+                    i += 1
+                    idx -= 1
+            elif self._free_dec[i][idx]:
+                chosen.extend(range(i, i + run))
+                i += run
+                idx -= self._offset
+                in_block = True
+            else:
+                i += 1
+        return chosen
+
+
+class ProfileIndex:
+    """Cheapest start for an appliance with a load profile.
+
+    ``profile`` is the power draw (kW) for each consecutive ``step`` seconds
+    of a run. The cost of a run starting at t is the sliding dot product
+    sum_k w_k * F(t + k*step) of the price integral F with the profile's
+    differences w, so piecewise-constant profiles only touch the steps
+    where the draw changes. Candidate starts lie on a step grid aligned to
+    the timeline; the cost of every start is computed once, with a suffix
+    minimum so a moving range start only moves a pointer.
+    """
+
+    def __init__(
+        self,
+        series: PriceSeries,
+        range_end: float,
+        profile: Sequence[float],
+        step: float,
+    ):
+        segs = series.clip(float("-inf"), range_end)
+        self.segs = segs
+        self.range_end = range_end
+        self.profile = tuple(profile)
+        self.step = step
+        self.duration = len(self.profile) * step
+        self.origin = segs.starts[0] if segs else 0.0
+        k_len = len(self.profile)
+        if not segs or step <= 0 or k_len == 0:
+            self._costs = array("d")
+            self._best_from = array("l", [-1])
+            return
+
+        weights: List[Tuple[int, float]] = []
+        prev = 0.0
+        for k, kw in enumerate((*self.profile, 0.0)):
+            if kw != prev:
+                weights.append((k, prev - kw))
+            prev = kw
+
+        last = math.floor((range_end - self.origin) / step + 1e-9)
+        costs = self._run_costs(WindowSearch(segs), last, weights)
+        n = len(costs)
+        best_from = array("l", [-1]) * (n + 1)
+        best = -1
+        for j in range(n - 1, -1, -1):
+            if costs[j] < math.inf and (
+                best < 0 or costs[j] <= costs[best] + 1e-12 * abs(costs[best])
+            ):
+                best = j
+            best_from[j] = best
+        self._costs = costs
+        self._best_from = best_from
+
+    def _run_costs(
+        self, search: WindowSearch, last: int, weights: List[Tuple[int, float]]
+    ) -> array:
+        k_len = len(self.profile)
+        if _np is not None:
+            return array(
+                "d",
+                _np.profile_costs(
+                    self.segs,
+                    search._cum_cost,
+                    search._cum_cover,
+                    self.origin,
+                    self.step,
+                    last,
+                    weights,
+                    k_len,
+                    self.duration,
+                ),
+            )
+        cost_at = array("d")
+        cover_at = array("d")
+        for i in range(last + 1):
+            c, w = search.integral(self.origin + i * self.step)
+            cost_at.append(c)
+            cover_at.append(w)
+        n = max(0, last - k_len + 1)
+        costs = array("d", [math.inf]) * n
+        for j in range(n):
+            if cover_at[j + k_len] - cover_at[j] + 1e-6 < self.duration:
+                continue
+            total = 0.0
+            for k, w in weights:
+                total += w * cost_at[j + k]
+            costs[j] = total / 3600
+        return costs
+
+    @property
+    def energy(self) -> float:
+        """kWh of one run."""
+        return sum(self.profile) * self.step / 3600
+
+    def select_run(self, range_start: float) -> Optional[Tuple[float, float]]:
+        """(start, cost) of the cheapest run starting at or after range_start."""
+        first = max(0, math.ceil((range_start - self.origin) / self.step - 1e-9))
+        if first >= len(self._costs):
+            return None
+        j = self._best_from[first]
+        if j < 0:
+            return None
+        return self.origin + j * self.step, self._costs[j]
+
+    def select(self, range_start: float) -> List[Interval]:
+        run = self.select_run(range_start)
+        if run is None:
+            return []
+        start, cost = run
+        energy = self.energy
+        return [(start, start + self.duration, cost / energy if energy else None)]
+
+
+WindowIndex = Union[ContinuousIndex, SlotIndex, ConstrainedIndex, ProfileIndex]
+# (range start, range end, duration, continuous)
+WindowSpec = Tuple[float, float, float, bool]
+
+
+class PreparedTimeline:
+    """Prefix sums and price order of a timeline, built once and shared by
+    any number of window queries over it."""
+
+    # Load-profile indexes kept per timeline, oldest dropped first.
+    PROFILE_CACHE_SIZE = 8
+
+    def __init__(self, series: PriceSeries) -> None:
+        self.series = series
+        self.search = WindowSearch(series)
+        self._order: Optional[List[int]] = None
+        self._profiles: Dict[Tuple[float, Tuple[float, ...], float], ProfileIndex] = {}
+
+    def continuous(
+        self, range_start: float, range_end: float, duration: float
+    ) -> List[Interval]:
+        segs = self.series.clip(range_start, range_end)
+        if not segs:
+            return []
+        best = self.search.cheapest(range_start, range_end, duration, segs)
+        if best is None:
+            return []
+        return [window_interval(segs, segs.start(best[0]), duration)]
+
+    def slots(
+        self, range_start: float, range_end: float, duration: float
+    ) -> List[Interval]:
+        series = self.series
+        if self._order is None:
+            self._order = price_order(series)
+        need = duration
+        picks: List[Segment] = []
+        for i in self._order:
+            if need <= 0:
+                break
+            s = max(series.start(i), range_start)
+            e = min(series.end(i), range_end)
+            if e <= s:
+                continue
+            take = min(need, e - s)
+            picks.append((s, s + take, series.prices[i]))
+            need -= take
+        return group_picks(picks)
+
+    def profile(
+        self,
+        range_start: float,
+        range_end: float,
+        profile: Sequence[float],
+        step: float,
+    ) -> List[Interval]:
+        """Cheapest run of a load profile; repeated queries for the same run
+        and range end only move the range start of a cached ProfileIndex."""
+        key = (range_end, tuple(profile), step)
+        index = self._profiles.get(key)
+        if index is None:
+            if len(self._profiles) >= self.PROFILE_CACHE_SIZE:
+                del self._profiles[next(iter(self._profiles))]
+            index = ProfileIndex(self.series, range_end, profile, step)
+            self._profiles[key] = index
+        return index.select(range_start)
+
+    def select(
+        self, range_start: float, range_end: float, duration: float, continuous: bool
+    ) -> List[Interval]:
+        if continuous:
+            return self.continuous(range_start, range_end, duration)
+        return self.slots(range_start, range_end, duration)
+
+
+class IntervalIndex:
+    """Computed intervals sorted by start, with a running maximum of the
+    ends so a range query is two bisects plus the matches."""
+
+    __slots__ = ("items", "starts", "max_ends")
+
+    def __init__(self, intervals: Iterable[Interval]) -> None:
+        self.items: List[Interval] = sorted(intervals, key=lambda x: x[0])
+        self.starts = array("d", (s for s, _, _ in self.items))
+        self.max_ends = array("d")
+        top = float("-inf")
+        for _, e, _ in self.items:
+            top = max(top, e)
+            self.max_ends.append(top)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def overlapping(self, t0: float, t1: float) -> List[Interval]:
+        lo = bisect_right(self.max_ends, t0)
+        hi = bisect_left(self.starts, t1)
+        return [iv for iv in self.items[lo:hi] if iv[1] > t0]
+
+    def current_or_next(self, t: float) -> Optional[Interval]:
+        for iv in self.items[bisect_right(self.max_ends, t) :]:
+            if iv[1] > t:
+                return iv
+        return None
+
+
+# (range start, range end, intervals) of one planned day.
+PlanEntry = Tuple[float, float, List[Interval]]
+
+
+def plan_windows(
+    series: PriceSeries,
+    ranges: Sequence[Tuple[float, float]],
+    duration: float,
+    continuous: bool,
+    constraints: Optional[BlockConstraints] = None,
+) -> List[PlanEntry]:
+    """Cheapest intervals for each range, sharing one prepared timeline."""
+    if continuous or constraints is None:
+        prepared = PreparedTimeline(series)
+        return [
+            (r0, r1, prepared.select(r0, r1, duration, continuous))
+            for r0, r1 in ranges
+        ]
+    plan: List[PlanEntry] = []
+    for r0, r1 in ranges:
+        segs = series.clip(r0, r1)
+        picks = ConstrainedIndex(segs, r1, duration, constraints).select(r0)
+        plan.append((r0, r1, picks if segs else []))
+    return plan
+
+
+def select_many(
+    prepared: PreparedTimeline, specs: Iterable[WindowSpec]
+) -> List[List[Interval]]:
+    """Cheapest intervals for each (range start, range end, duration,
+    continuous) spec, all answered from one prepared timeline."""
+    return [prepared.select(*spec) for spec in specs]
+
+
+def intervals_average(intervals: List[Interval]) -> Optional[float]:
+    total_sec = sum(e - s for s, e, _ in intervals)
+    if total_sec <= 0:
+        return None
+    return sum(a * (e - s) for s, e, a in intervals) / total_sec
+
+
+class PriceRanking:
+    """Prices of a horizon in ascending order with cumulative durations.
+
+    Built once per horizon; time-weighted percentile, rank and threshold
+    queries are then a single bisect. Segments count with their full
+    length, so the ranking does not change while "now" moves through one.
+    """
+
+    __slots__ = ("prices", "cum")
+
+    def __init__(self, series: PriceSeries) -> None:
+        if _np is not None:
+            prices, cum = _np.ranking(series)
+            self.prices = array("d", prices)
+            self.cum = array("d", cum)
+            return
+        pairs = sorted(
+            (p, e - s)
+            for s, e, p in zip(series.starts, series.ends, series.prices)
+            if e > s
+        )
+        self.prices = array("d", (p for p, _ in pairs))
+        cum = array("d", [0.0])
+        for _, d in pairs:
+            cum.append(cum[-1] + d)
+        self.cum = cum
+
+    @property
+    def total(self) -> float:
+        return self.cum[-1]
+
+    def time_at_or_below(self, price: float) -> float:
+        return self.cum[bisect_right(self.prices, price)]
+
+    def rank(self, price: float) -> Optional[float]:
+        """Share of the horizon (0..1) that is strictly cheaper than price."""
+        if self.total <= 0:
+            return None
+        return self.cum[bisect_left(self.prices, price)] / self.total
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Lowest price such that at least q (0..1) of the horizon is at or
+        below it."""
+        n = len(self.prices)
+        if n == 0:
+            return None
+        k = bisect_left(self.cum, q * self.total - 1e-9, 1)
+        return self.prices[min(max(k, 1), n) - 1]
+
+
+def price_at(series: PriceSeries, t: float) -> Optional[float]:
+    i = bisect_right(series.starts, t) - 1
+    if i < 0 or t >= series.end(i) or t < series.start(i):
+        return None
+    return series.prices[i]
+
+
+def intervals_at_or_below(series: PriceSeries, cutoff: float) -> List[Interval]:
+    picks = [(s, e, p) for s, e, p in series if p <= cutoff and e > s]
+    return group_picks(picks)
+
+
+def build_index(
+    series: PriceSeries,
+    range_end: float,
+    duration: float,
+    continuous: bool,
+    constraints: Optional[BlockConstraints] = None,
+) -> WindowIndex:
+    """Index answering the cheapest intervals for any later range start.
+
+    Side-effect free so it can run in an executor thread or process.
+    """
+    if continuous:
+        return ContinuousIndex(series, range_end, duration)
+    if constraints is not None:
+        return ConstrainedIndex(series, range_end, duration, constraints)
+    return SlotIndex(series, range_end, duration)
+
@@ -0,0 +1,22 @@
+from __future__ import annotations
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_STATS, DOMAIN
+from .core import BACKEND
+from .sources import timestamp_cache_info
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    stats = hass.data.get(DOMAIN, {}).get(DATA_STATS, {}).get(entry.entry_id)
+    return {
+        "data": dict(entry.data),
+        "options": dict(entry.options or {}),
+        "backend": BACKEND,
+        "timestamp_cache": timestamp_cache_info(),
+        "recalc": stats.as_dict() if stats is not None else None,
+    }
@@ -0,0 +1,41 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Any, Callable, TypeVar
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .const import DATA_PROCESS_POOL, DOMAIN
+
+_T = TypeVar("_T")
+
+
+@callback
+def _get_process_pool(hass: HomeAssistant) -> ProcessPoolExecutor:
+    data = hass.data.setdefault(DOMAIN, {})
+    pool = data.get(DATA_PROCESS_POOL)
+    if pool is None:
+        pool = data[DATA_PROCESS_POOL] = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+
+        @callback
+        def _shutdown(_: Event) -> None:
+            data.pop(DATA_PROCESS_POOL, None)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _shutdown)
+    return pool
+
+
+async def async_run_offloaded(
+    hass: HomeAssistant, use_process: bool, func: Callable[..., _T], *args: Any
+) -> _T:
+    """Run a pure computation off the event loop.
+
+    ``func`` and its arguments must be picklable when ``use_process`` is set.
+    """
+    if use_process:
+        return await hass.loop.run_in_executor(_get_process_pool(hass), func, *args)
+    return await hass.async_add_executor_job(func, *args)
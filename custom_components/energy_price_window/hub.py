@@ -0,0 +1,190 @@
+from __future__ import annotations
+import asyncio
+from datetime import datetime
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import (
+    async_track_point_in_time,
+    async_track_state_change_event,
+)
+
+from .const import DATA_HUB, DOMAIN
+from .util import to_local
+
+if TYPE_CHECKING:
+    from .binary_sensor import PriceWindowBinarySensor
+
+_LOGGER = logging.getLogger(__name__)
+
+# A timer firing this close before a wake-up point serves it as well.
+WAKEUP_TOLERANCE = 0.001
+
+
+class _Batch:
+    """Sensors sharing one debounce setting, recalculated together."""
+
+    def __init__(self, hass: HomeAssistant, cooldown: float) -> None:
+        self.pending: Dict[PriceWindowBinarySensor, List[str]] = {}
+        self.debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=cooldown,
+            immediate=False,
+            function=self._async_flush,
+        )
+
+    async def _async_flush(self) -> None:
+        # Debouncer.async_call does nothing while a flush runs, so triggers
+        # queued meanwhile (a recalculation may wait on the executor) are
+        # drained here instead of waiting for an unrelated trigger.
+        while self.pending:
+            pending, self.pending = self.pending, {}
+            results = await asyncio.gather(
+                *(sensor.async_hub_update(kinds) for sensor, kinds in pending.items()),
+                return_exceptions=True,
+            )
+            for sensor, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    _LOGGER.error(
+                        "Recalculation of %s failed", sensor.entity_id, exc_info=result
+                    )
+
+
+class PriceWindowHub:
+    """Source listeners and wake-up timer shared by every window sensor.
+
+    Each source entity is subscribed once however many sensors read it, and
+    one timer is armed at the earliest wake-up any sensor asked for.
+    Triggers are queued per debounce setting and fanned out as one batch,
+    so sensors woken by the same change recalculate and write together.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._sources: Dict[str, Set[PriceWindowBinarySensor]] = {}
+        self._unsub_sources: Dict[str, CALLBACK_TYPE] = {}
+        self._wakeups: Dict[PriceWindowBinarySensor, float] = {}
+        self._unsub_timer: Optional[CALLBACK_TYPE] = None
+        self._timer_at: Optional[float] = None
+        self._batches: Dict[float, _Batch] = {}
+
+    @callback
+    def async_add_sensor(
+        self, sensor: PriceWindowBinarySensor, entity_ids: Iterable[str]
+    ) -> CALLBACK_TYPE:
+        """Deliver changes of ``entity_ids`` to the sensor; returns the
+        function that detaches it again."""
+        entity_ids = list(entity_ids)
+        for entity_id in entity_ids:
+            sensors = self._sources.setdefault(entity_id, set())
+            sensors.add(sensor)
+            if entity_id not in self._unsub_sources:
+                self._unsub_sources[entity_id] = async_track_state_change_event(
+                    self.hass, [entity_id], self._async_handle_source
+                )
+
+        @callback
+        def _remove() -> None:
+            for entity_id in entity_ids:
+                sensors = self._sources.get(entity_id)
+                if sensors is None:
+                    continue
+                sensors.discard(sensor)
+                if not sensors:
+                    del self._sources[entity_id]
+                    self._unsub_sources.pop(entity_id)()
+            for batch in self._batches.values():
+                batch.pending.pop(sensor, None)
+            self.async_schedule(sensor, None)
+
+        return _remove
+
+    @callback
+    def async_schedule(
+        self, sensor: PriceWindowBinarySensor, when: Optional[float]
+    ) -> None:
+        """Wake the sensor at ``when`` (epoch seconds), or never for None."""
+        if when is None:
+            self._wakeups.pop(sensor, None)
+        else:
+            self._wakeups[sensor] = when
+        self._arm_timer()
+
+    async def async_trigger(self, sensor: PriceWindowBinarySensor, kind: str) -> None:
+        await self._async_queue([sensor], kind)
+
+    async def _async_queue(
+        self, sensors: Iterable[PriceWindowBinarySensor], kind: str
+    ) -> None:
+        touched: Dict[float, _Batch] = {}
+        for sensor in sensors:
+            cooldown = sensor.debounce
+            batch = self._batches.get(cooldown)
+            if batch is None:
+                batch = self._batches[cooldown] = _Batch(self.hass, cooldown)
+            batch.pending.setdefault(sensor, []).append(kind)
+            touched[cooldown] = batch
+        for batch in touched.values():
+            await batch.debouncer.async_call()
+
+    async def _async_handle_source(self, event: Event) -> None:
+        sensors = self._sources.get(event.data["entity_id"])
+        if sensors:
+            await self._async_queue(list(sensors), "source")
+
+    @callback
+    def _arm_timer(self) -> None:
+        earliest = min(self._wakeups.values(), default=None)
+        if earliest == self._timer_at:
+            return
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._timer_at = earliest
+        if earliest is not None:
+            self._unsub_timer = async_track_point_in_time(
+                self.hass, self._async_handle_timer, to_local(earliest)
+            )
+
+    async def _async_handle_timer(self, now: datetime) -> None:
+        self._unsub_timer = None
+        self._timer_at = None
+        due_by = now.timestamp() + WAKEUP_TOLERANCE
+        due = [s for s, when in self._wakeups.items() if when <= due_by]
+        for sensor in due:
+            del self._wakeups[sensor]
+        self._arm_timer()
+        await self._async_queue(due, "timer")
+
+    @property
+    def source_entities(self) -> Set[str]:
+        """Price sources read by at least one registered sensor."""
+        return set(self._sources)
+
+    @property
+    def is_idle(self) -> bool:
+        """True once every sensor has detached."""
+        return not self._sources and not self._wakeups
+
+    @callback
+    def async_shutdown(self) -> None:
+        for unsub in self._unsub_sources.values():
+            unsub()
+        self._unsub_sources.clear()
+        self._sources.clear()
+        self._wakeups.clear()
+        self._arm_timer()
+        for batch in self._batches.values():
+            batch.debouncer.async_cancel()
+        self._batches.clear()
+
+
+def get_hub(hass: HomeAssistant) -> PriceWindowHub:
+    data = hass.data.setdefault(DOMAIN, {})
+    hub = data.get(DATA_HUB)
+    if hub is None:
+        hub = data[DATA_HUB] = PriceWindowHub(hass)
+    return hub
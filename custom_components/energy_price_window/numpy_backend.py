@@ -0,0 +1,172 @@
+"""NumPy versions of the per-segment loops in core.
+
+Imported by core when NumPy is available. Every function repeats the
+pure-Python arithmetic operation for operation (float64 throughout, sums
+accumulated in the same order), so both backends pick the same windows.
+Series are duck-typed PriceSeries; their memoryview columns are wrapped
+without copying.
+"""
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def _columns(series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return (
+        np.asarray(series.starts, dtype=np.float64),
+        np.asarray(series.ends, dtype=np.float64),
+        np.asarray(series.prices, dtype=np.float64),
+    )
+
+
+def _clamped(series, starts: np.ndarray, ends: np.ndarray):
+    """Starts and ends with the clip bounds applied, as PriceSeries.start/end."""
+    if not len(starts):
+        return starts, ends
+    lower = series.lower
+    upper = series.upper
+    if lower is not None and starts[0] < lower:
+        starts = starts.copy()
+        starts[0] = lower
+    if upper is not None and ends[-1] > upper:
+        ends = ends.copy()
+        ends[-1] = upper
+    return starts, ends
+
+
+def prefix_sums(series) -> Tuple[List[float], List[float]]:
+    """Cumulative price·seconds and covered seconds, as WindowSearch."""
+    starts, ends, prices = _columns(series)
+    starts, ends = _clamped(series, starts, ends)
+    d = ends - starts
+    inside = d > 0
+    # accumulate is a sequential loop, so the sums match the Python ones.
+    cost = np.cumsum(np.where(inside, prices * d, 0.0))
+    cover = np.cumsum(np.where(inside, d, 0.0))
+    return [0.0, *cost.tolist()], [0.0, *cover.tolist()]
+
+
+def integrals(
+    series,
+    cum_cost: Sequence[float],
+    cum_cover: Sequence[float],
+    ts: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """WindowSearch.integral at every time in ``ts``."""
+    raw_starts, ends, prices = _columns(series)
+    if not len(raw_starts):
+        return np.zeros(len(ts)), np.zeros(len(ts))
+    starts, ends = _clamped(series, raw_starts, ends)
+    k = np.searchsorted(raw_starts, ts, side="right") - 1
+    kk = np.maximum(k, 0)
+    d = np.minimum(ts, ends[kk]) - starts[kk]
+    base_cost = np.asarray(cum_cost, dtype=np.float64)[kk]
+    base_cover = np.asarray(cum_cover, dtype=np.float64)[kk]
+    inside = d > 0
+    cost = np.where(inside, base_cost + prices[kk] * d, base_cost)
+    cover = np.where(inside, base_cover + d, base_cover)
+    before = k < 0
+    cost[before] = 0.0
+    cover[before] = 0.0
+    return cost, cover
+
+
+def windows(
+    series,
+    cum_cost: Sequence[float],
+    cum_cover: Sequence[float],
+    t0: np.ndarray,
+    t1: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """WindowSearch.window for every pair (t0[i], t1[i])."""
+    c0, w0 = integrals(series, cum_cost, cum_cover, t0)
+    c1, w1 = integrals(series, cum_cost, cum_cover, t1)
+    return c1 - c0, w1 - w0
+
+
+def start_averages(
+    series,
+    candidates,
+    cum_cost: Sequence[float],
+    cum_cover: Sequence[float],
+    duration: float,
+    range_start: float,
+    range_end: float,
+) -> List[Tuple[float, bool]]:
+    """(average, valid) of the window of ``duration`` over ``series`` at
+    every segment start of ``candidates``.
+
+    Starts before ``range_start``, windows running past ``range_end`` and
+    windows with gaps are invalid, as in WindowSearch.cheapest.
+    """
+    starts, ends, _ = _columns(candidates)
+    s0, _ = _clamped(candidates, starts, ends)
+    t_end = s0 + duration
+    cost, covered = windows(series, cum_cost, cum_cover, s0, t_end)
+    ok = (
+        (s0 >= range_start)
+        & (t_end <= range_end)
+        & ~(covered + 1e-6 < duration)
+        & (covered > 0)
+    )
+    avgs = np.divide(cost, covered, out=np.zeros(len(s0)), where=ok)
+    return list(zip(avgs.tolist(), ok.tolist()))
+
+
+def grid_windows(
+    series,
+    cum_cost: Sequence[float],
+    cum_cover: Sequence[float],
+    origin: float,
+    step: float,
+    first: int,
+    last: int,
+) -> Tuple[List[float], List[float]]:
+    """(cost, covered) of every grid slot [origin + j*step, +step), j in
+    [first, last)."""
+    t0 = origin + np.arange(first, last, dtype=np.float64) * step
+    cost, covered = windows(series, cum_cost, cum_cover, t0, t0 + step)
+    return cost.tolist(), covered.tolist()
+
+
+def profile_costs(
+    series,
+    cum_cost: Sequence[float],
+    cum_cover: Sequence[float],
+    origin: float,
+    step: float,
+    last: int,
+    weights: Sequence[Tuple[int, float]],
+    k_len: int,
+    duration: float,
+) -> List[float]:
+    """Run cost at every grid start for ProfileIndex (inf where uncovered)."""
+    grid = origin + np.arange(last + 1, dtype=np.float64) * step
+    cost_at, cover_at = integrals(series, cum_cost, cum_cover, grid)
+    n = max(0, last - k_len + 1)
+    total = np.zeros(n)
+    for k, w in weights:
+        total = total + w * cost_at[k : k + n]
+    costs = total / 3600
+    short = cover_at[k_len : k_len + n] - cover_at[:n] + 1e-6 < duration
+    costs[short] = np.inf
+    return costs.tolist()
+
+
+def price_order(series) -> List[int]:
+    """Segment indices by (price, start)."""
+    starts, _, prices = _columns(series)
+    return np.lexsort((starts, prices)).tolist()
+
+
+def ranking(series) -> Tuple[List[float], List[float]]:
+    """Sorted prices and cumulative durations for PriceRanking."""
+    starts, ends, prices = _columns(series)
+    d = ends - starts
+    keep = d > 0
+    d = d[keep]
+    prices = prices[keep]
+    order = np.lexsort((d, prices))
+    cum = np.cumsum(d[order])
+    return prices[order].tolist(), [0.0, *cum.tolist()]
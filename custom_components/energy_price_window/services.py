@@ -0,0 +1,264 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+import voluptuous as vol
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_AVERAGE,
+    ATTR_CONTINUOUS,
+    ATTR_COST,
+    ATTR_DURATION,
+    ATTR_END_TIME,
+    ATTR_ENERGY,
+    ATTR_FORECAST_ENTITY,
+    ATTR_INTERVALS,
+    ATTR_NEXT_START_TIME,
+    ATTR_SOURCE_ENTITY,
+    ATTR_START_TIME,
+    ATTR_WINDOWS,
+    CONF_CONTINUOUS,
+    CONF_DURATION,
+    CONF_END_TIME,
+    CONF_LOAD_PROFILE,
+    CONF_NAME,
+    CONF_PROFILE_STEP,
+    CONF_START_TIME,
+    DEFAULT_CONTINUOUS,
+    DEFAULT_PROFILE_STEP,
+    DOMAIN,
+    SERVICE_COMPUTE_WINDOWS,
+    SERVICE_FIND_WINDOW,
+)
+from .core import (
+    Interval,
+    PreparedTimeline,
+    WindowSpec,
+    intervals_average,
+    select_many,
+)
+from .store import get_price_store
+from .util import (
+    format_intervals,
+    parse_duration,
+    parse_load_profile,
+    resolve_range,
+    to_local,
+)
+
+WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_NAME): cv.string,
+        vol.Required(CONF_DURATION): vol.Any(vol.Coerce(float), cv.string),
+        vol.Optional(CONF_START_TIME): cv.string,
+        vol.Optional(CONF_END_TIME): cv.string,
+        vol.Optional(CONF_CONTINUOUS, default=DEFAULT_CONTINUOUS): cv.boolean,
+    }
+)
+
+COMPUTE_WINDOWS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SOURCE_ENTITY): cv.entity_id,
+        vol.Optional(ATTR_FORECAST_ENTITY): cv.entity_id,
+        vol.Required(ATTR_WINDOWS): vol.All(
+            cv.ensure_list, vol.Length(min=1), [WINDOW_SCHEMA]
+        ),
+    }
+)
+
+FIND_WINDOW_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_SOURCE_ENTITY): cv.entity_id,
+            vol.Optional(ATTR_FORECAST_ENTITY): cv.entity_id,
+            vol.Optional(CONF_DURATION): vol.Any(vol.Coerce(float), cv.string),
+            vol.Optional(CONF_START_TIME): cv.string,
+            vol.Optional(CONF_END_TIME): cv.string,
+            vol.Optional(CONF_CONTINUOUS, default=DEFAULT_CONTINUOUS): cv.boolean,
+            vol.Optional(CONF_LOAD_PROFILE): vol.Any(
+                cv.string, [vol.Coerce(float)]
+            ),
+            vol.Optional(CONF_PROFILE_STEP, default=DEFAULT_PROFILE_STEP): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key(CONF_DURATION, CONF_LOAD_PROFILE),
+)
+
+
+def _window_result(
+    start_dt: datetime,
+    end_dt: datetime,
+    duration_td: timedelta,
+    continuous: bool,
+    intervals: List[Interval],
+    now_local: datetime,
+) -> Dict[str, Any]:
+    now_ts = now_local.timestamp()
+    future_starts = [s for s, _, _ in intervals if s > now_ts]
+    return {
+        ATTR_START_TIME: start_dt.isoformat(),
+        ATTR_END_TIME: end_dt.isoformat(),
+        ATTR_DURATION: duration_td.total_seconds() / 3600,
+        ATTR_CONTINUOUS: continuous,
+        ATTR_INTERVALS: format_intervals(intervals),
+        ATTR_AVERAGE: intervals_average(intervals),
+        ATTR_NEXT_START_TIME: (
+            to_local(min(future_starts)).isoformat() if future_starts else None
+        ),
+    }
+
+
+def compute_windows(
+    prepared: PreparedTimeline,
+    specs: Sequence[Tuple[Any, Any, timedelta, bool]],
+    now_local: datetime,
+) -> List[Dict[str, Any]]:
+    """Results for (start, end, duration, continuous) specs; the ranges are
+    resolved here and every search runs on ``prepared``."""
+    series = prepared.series
+    horizon_end = series.end(len(series) - 1)
+    ranges = []
+    windows: List[WindowSpec] = []
+    for start_val, end_val, duration_td, continuous in specs:
+        start_dt, end_dt = resolve_range(
+            start_val, end_val, duration_td, now_local, horizon_end
+        )
+        ranges.append((start_dt, end_dt))
+        windows.append(
+            (
+                start_dt.timestamp(),
+                end_dt.timestamp(),
+                duration_td.total_seconds(),
+                continuous,
+            )
+        )
+    return [
+        _window_result(start_dt, end_dt, duration_td, continuous, intervals, now_local)
+        for (start_dt, end_dt), (_, _, duration_td, continuous), intervals in zip(
+            ranges, specs, select_many(prepared, windows)
+        )
+    ]
+
+
+def compute_profile_window(
+    prepared: PreparedTimeline,
+    start_val: Any,
+    end_val: Any,
+    profile: Sequence[float],
+    step: float,
+    now_local: datetime,
+) -> Dict[str, Any]:
+    """Cheapest run of a load profile, with its energy and estimated cost."""
+    series = prepared.series
+    duration_td = timedelta(seconds=len(profile) * step)
+    start_dt, end_dt = resolve_range(
+        start_val, end_val, duration_td, now_local, series.end(len(series) - 1)
+    )
+    intervals = prepared.profile(
+        start_dt.timestamp(), end_dt.timestamp(), profile, step
+    )
+    result = _window_result(start_dt, end_dt, duration_td, True, intervals, now_local)
+    energy = sum(profile) * step / 3600
+    average = result[ATTR_AVERAGE]
+    result[ATTR_ENERGY] = energy
+    result[ATTR_COST] = average * energy if average is not None else None
+    return result
+
+
+def _get_prepared(
+    hass: HomeAssistant, source: str, forecast: str | None
+) -> PreparedTimeline:
+    store = get_price_store(hass)
+    if not store.get(source):
+        raise HomeAssistantError(f"No price data available from {source}")
+    return store.prepared(source, forecast)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    async def _async_compute_windows(call: ServiceCall) -> ServiceResponse:
+        # One prepared timeline (merge + prefix sums) answers every window.
+        prepared = _get_prepared(
+            hass, call.data[ATTR_SOURCE_ENTITY], call.data.get(ATTR_FORECAST_ENTITY)
+        )
+        now_local = dt_util.now()
+        specs = []
+        for spec in call.data[ATTR_WINDOWS]:
+            duration_td = parse_duration(spec[CONF_DURATION])
+            if not duration_td:
+                raise HomeAssistantError(f"Invalid duration: {spec[CONF_DURATION]}")
+            specs.append(
+                (
+                    spec.get(CONF_START_TIME),
+                    spec.get(CONF_END_TIME),
+                    duration_td,
+                    spec[CONF_CONTINUOUS],
+                )
+            )
+        results = compute_windows(prepared, specs, now_local)
+        for spec, result in zip(call.data[ATTR_WINDOWS], results):
+            if CONF_NAME in spec:
+                result[CONF_NAME] = spec[CONF_NAME]
+        return {ATTR_WINDOWS: results}
+
+    async def _async_find_window(call: ServiceCall) -> ServiceResponse:
+        # Served from the store's prepared timeline; nothing is subscribed.
+        prepared = _get_prepared(
+            hass, call.data[ATTR_SOURCE_ENTITY], call.data.get(ATTR_FORECAST_ENTITY)
+        )
+        now_local = dt_util.now()
+        start_val = call.data.get(CONF_START_TIME)
+        end_val = call.data.get(CONF_END_TIME)
+        if CONF_LOAD_PROFILE in call.data:
+            profile = parse_load_profile(call.data[CONF_LOAD_PROFILE])
+            if not profile:
+                raise HomeAssistantError(
+                    f"Invalid load profile: {call.data[CONF_LOAD_PROFILE]}"
+                )
+            step_td = parse_duration(call.data[CONF_PROFILE_STEP])
+            if not step_td:
+                raise HomeAssistantError(
+                    f"Invalid profile step: {call.data[CONF_PROFILE_STEP]}"
+                )
+            return compute_profile_window(
+                prepared,
+                start_val,
+                end_val,
+                profile,
+                step_td.total_seconds(),
+                now_local,
+            )
+        duration_td = parse_duration(call.data[CONF_DURATION])
+        if not duration_td:
+            raise HomeAssistantError(f"Invalid duration: {call.data[CONF_DURATION]}")
+        [result] = compute_windows(
+            prepared,
+            [(start_val, end_val, duration_td, call.data[CONF_CONTINUOUS])],
+            now_local,
+        )
+        return result
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_COMPUTE_WINDOWS,
+        _async_compute_windows,
+        schema=COMPUTE_WINDOWS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_WINDOW,
+        _async_find_window,
+        schema=FIND_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
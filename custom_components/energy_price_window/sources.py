@@ -0,0 +1,278 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from homeassistant.core import State
+from homeassistant.util import dt as dt_util
+
+from .core import PriceSeries, Segment
+
+# Price attributes repeat the same few hundred strings all day.
+TIMESTAMP_CACHE_SIZE = 4096
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return (
+            value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+            if value.tzinfo is None
+            else value
+        )
+    if isinstance(value, str):
+        dt = dt_util.parse_datetime(value)
+        if dt:
+            return (
+                dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+                if dt.tzinfo is None
+                else dt
+            )
+        try:
+            naive = datetime.fromisoformat(value)
+            return naive.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        except Exception:
+            return None
+    return None
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def _string_timestamp(value: str) -> Optional[float]:
+    # datetime.fromisoformat handles what the known integrations emit; the
+    # parse_datetime chain is only tried when it fails.
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        dt = parse_datetime(value)
+        if dt is None:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return dt.timestamp()
+
+
+def iso_timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds of a datetime or ISO 8601 string.
+
+    String conversions are memoised in a bounded LRU shared by every
+    source; naive strings depend on the time zone, so the cache is cleared
+    when it changes.
+    """
+    if isinstance(value, str):
+        return _string_timestamp(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        return value.timestamp()
+    return None
+
+
+def iso_timestamps(values: Iterable[Any]) -> List[Optional[float]]:
+    """iso_timestamp over a whole attribute list."""
+    cached = _string_timestamp
+    return [cached(v) if isinstance(v, str) else iso_timestamp(v) for v in values]
+
+
+def clear_timestamp_cache() -> None:
+    _string_timestamp.cache_clear()
+
+
+def timestamp_cache_info() -> Dict[str, Any]:
+    info = _string_timestamp.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
+
+
+def _slot_length(starts: Sequence[Optional[float]]) -> float:
+    if len(starts) >= 2 and starts[0] is not None and starts[1] is not None:
+        if starts[1] > starts[0]:
+            return starts[1] - starts[0]
+    return timedelta(hours=1).total_seconds()
+
+
+def _read_start_end(
+    items: Any,
+    start_key: str,
+    end_key: Optional[str],
+    price_keys: Sequence[str],
+) -> PriceSeries:
+    """Segments from dicts with a start, an optional end and a price.
+
+    Items without an end last one slot, inferred once from the first two
+    starts.
+    """
+    rows = [p for p in items or () if isinstance(p, dict)]
+    starts = iso_timestamps([p.get(start_key) for p in rows])
+    if end_key:
+        ends = iso_timestamps([p.get(end_key) for p in rows])
+    else:
+        slot = _slot_length(starts)
+        ends = [st + slot if st is not None else None for st in starts]
+    out: List[Segment] = []
+    for p, st, ed in zip(rows, starts, ends):
+        pr = None
+        for key in price_keys:
+            pr = p.get(key)
+            if pr is not None:
+                break
+        if st is None or pr is None:
+            continue
+        if ed is None or ed <= st:
+            continue
+        out.append((st, ed, float(pr)))
+    return PriceSeries.from_segments(out)
+
+
+def _has_list(attrs: Mapping[str, Any], key: str, *fields: str) -> bool:
+    items = attrs.get(key)
+    if not isinstance(items, (list, tuple)) or not items:
+        return False
+    first = items[0]
+    return isinstance(first, dict) and all(f in first for f in fields)
+
+
+class SourceAdapter(ABC):
+    """Reads one integration's attribute layout into a PriceSeries."""
+
+    name = "base"
+
+    @abstractmethod
+    def matches(self, attrs: Mapping[str, Any]) -> bool:
+        """True if ``attrs`` have this adapter's layout."""
+
+    @abstractmethod
+    def read(self, attrs: Mapping[str, Any]) -> PriceSeries:
+        """The prices in ``attrs``, which ``matches`` accepted."""
+
+
+class StromligningAdapter(SourceAdapter):
+    """Strømligning: ``prices`` with ISO ``start``/``end`` and ``price``."""
+
+    name = "stromligning"
+
+    def matches(self, attrs: Mapping[str, Any]) -> bool:
+        return _has_list(attrs, "prices", "start", "end", "price")
+
+    def read(self, attrs: Mapping[str, Any]) -> PriceSeries:
+        return _read_start_end(attrs.get("prices"), "start", "end", ("price",))
+
+
+class EnergiDataServiceAdapter(SourceAdapter):
+    """Energi Data Service: ``raw_today``/``raw_tomorrow`` with ``hour`` and
+    ``price``; the slot length follows from the first two hours."""
+
+    name = "energidataservice"
+
+    def matches(self, attrs: Mapping[str, Any]) -> bool:
+        return any(
+            _has_list(attrs, key, "hour", "price")
+            for key in ("raw_today", "raw_tomorrow")
+        )
+
+    def read(self, attrs: Mapping[str, Any]) -> PriceSeries:
+        items = list(attrs.get("raw_today") or []) + list(
+            attrs.get("raw_tomorrow") or []
+        )
+        return _read_start_end(items, "hour", None, ("price",))
+
+
+class NordPoolAdapter(SourceAdapter):
+    """Nord Pool: ``raw_today``/``raw_tomorrow`` with ``start``, ``end`` and
+    ``value``."""
+
+    name = "nordpool"
+
+    def matches(self, attrs: Mapping[str, Any]) -> bool:
+        return any(
+            _has_list(attrs, key, "start", "end", "value")
+            for key in ("raw_today", "raw_tomorrow")
+        )
+
+    def read(self, attrs: Mapping[str, Any]) -> PriceSeries:
+        items = list(attrs.get("raw_today") or []) + list(
+            attrs.get("raw_tomorrow") or []
+        )
+        return _read_start_end(items, "start", "end", ("value",))
+
+
+class TibberAdapter(SourceAdapter):
+    """Tibber: ``today``/``tomorrow`` with ``startsAt`` and ``total``."""
+
+    name = "tibber"
+
+    def matches(self, attrs: Mapping[str, Any]) -> bool:
+        return any(
+            _has_list(attrs, key, "startsAt", "total") for key in ("today", "tomorrow")
+        )
+
+    def read(self, attrs: Mapping[str, Any]) -> PriceSeries:
+        items = list(attrs.get("today") or []) + list(attrs.get("tomorrow") or [])
+        return _read_start_end(items, "startsAt", None, ("total",))
+
+
+class GenericAdapter(SourceAdapter):
+    """Any list attribute of ``start`` (+ optional ``end``) and ``price`` or
+    ``value`` dicts."""
+
+    name = "generic"
+    keys = ("prices", "data", "forecast", "raw_today")
+
+    def _items(self, attrs: Mapping[str, Any]) -> Optional[list]:
+        for key in self.keys:
+            if _has_list(attrs, key, "start"):
+                first = attrs[key][0]
+                if "price" in first or "value" in first:
+                    return attrs[key]
+        return None
+
+    def matches(self, attrs: Mapping[str, Any]) -> bool:
+        return self._items(attrs) is not None
+
+    def read(self, attrs: Mapping[str, Any]) -> PriceSeries:
+        items = self._items(attrs)
+        if not items:
+            return PriceSeries.from_segments(())
+        has_end = "end" in items[0]
+        return _read_start_end(
+            items,
+            "start",
+            "end" if has_end else None,
+            ("price", "value"),
+        )
+
+
+# Tried in order; the generic adapter goes last.
+ADAPTERS: List[SourceAdapter] = [
+    StromligningAdapter(),
+    EnergiDataServiceAdapter(),
+    NordPoolAdapter(),
+    TibberAdapter(),
+    GenericAdapter(),
+]
+
+
+def register_adapter(adapter: SourceAdapter) -> None:
+    """Add a provider ahead of the generic fallback."""
+    ADAPTERS.insert(len(ADAPTERS) - 1, adapter)
+
+
+def detect_adapter(state: State) -> Optional[SourceAdapter]:
+    attrs = state.attributes or {}
+    for adapter in ADAPTERS:
+        if adapter.matches(attrs):
+            return adapter
+    return None
+
+
+def read_price_series(
+    state: State, adapter: Optional[SourceAdapter] = None
+) -> PriceSeries:
+    if adapter is None:
+        adapter = detect_adapter(state)
+    if adapter is None:
+        return PriceSeries.from_segments(())
+    return adapter.read(state.attributes or {})
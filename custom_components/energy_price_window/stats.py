@@ -0,0 +1,85 @@
+from __future__ import annotations
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+import time
+from typing import Any, Dict, Iterator, List
+
+# Stages of a sensor recalculation, in order.
+STAGES = ("read", "merge", "clip", "search", "write")
+# Histogram bucket upper bounds in milliseconds; the last bucket is open.
+BUCKETS_MS = (0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0)
+
+
+class Histogram:
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets: List[int] = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "max_ms": self.max_ms,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class RecalcStats:
+    """Per-sensor trigger counters and stage timings.
+
+    Timing a stage costs two perf_counter calls, so it stays on in
+    production.
+    """
+
+    def __init__(self) -> None:
+        self.triggers: Counter = Counter()
+        self.recalcs = 0
+        self.index_builds = 0
+        self.segments = 0
+        self.intervals = 0
+        self.total = Histogram()
+        self.stages: Dict[str, Histogram] = {s: Histogram() for s in STAGES}
+
+    def trigger(self, kind: str, count: int = 1) -> None:
+        self.triggers[kind] += count
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name].add((time.perf_counter() - t0) * 1000)
+
+    @contextmanager
+    def recalc(self) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.recalcs += 1
+            self.total.add((time.perf_counter() - t0) * 1000)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "triggers": dict(self.triggers),
+            "recalcs": self.recalcs,
+            "index_builds": self.index_builds,
+            "last_segments": self.segments,
+            "last_intervals": self.intervals,
+            "recalc": self.total.as_dict(),
+            "stages": {name: h.as_dict() for name, h in self.stages.items()},
+        }
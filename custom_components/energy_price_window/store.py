@@ -0,0 +1,196 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from array import array
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DATA_HUB,
+    DATA_PRICE_STORE,
+    DOMAIN,
+    STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .core import PreparedTimeline, PriceSeries, merge_forecast
+from .sources import SourceAdapter, detect_adapter, read_price_series
+
+
+class PriceStore:
+    """Parsed price series shared by every sensor, keyed by source entity.
+
+    A series is parsed once per source state change and all callers share
+    the same immutable PriceSeries. The source adapter is detected on the
+    first state with data and reused until the layout changes.
+
+    Parsed series are persisted, so after a restart a source that has not
+    loaded yet is answered from the last known prices; once it loads, a
+    series equal to the persisted one keeps the same object and every
+    cache built on it stays valid. Only sources a registered sensor reads
+    are kept: once Home Assistant has started, restored prices nobody asked
+    for and series read only by the services are dropped.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._cache: Dict[str, Tuple[Tuple[datetime, str], PriceSeries]] = {}
+        self._timelines: Dict[Tuple[str, Optional[str]], Tuple[Any, ...]] = {}
+        self._prepared: Dict[Tuple[str, Optional[str]], PreparedTimeline] = {}
+        self._adapters: Dict[str, SourceAdapter] = {}
+        self._restored: Dict[str, PriceSeries] = {}
+        self._persist: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._loaded = False
+        self._started = False
+
+    async def async_load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        data = await self._persist.async_load() or {}
+        for entity_id, cols in data.items():
+            try:
+                self._restored[entity_id] = PriceSeries(
+                    memoryview(array("d", cols["starts"])).toreadonly(),
+                    memoryview(array("d", cols["ends"])).toreadonly(),
+                    memoryview(array("d", cols["prices"])).toreadonly(),
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def _tracked(self) -> Set[str]:
+        hub = self.hass.data.get(DOMAIN, {}).get(DATA_HUB)
+        return hub.source_entities if hub is not None else set()
+
+    @callback
+    def async_started(self) -> None:
+        """Every sensor has registered; forget what none of them reads."""
+        self._started = True
+        self.async_prune()
+
+    @callback
+    def async_prune(self) -> None:
+        """Drop the series of sources no registered sensor reads, from
+        memory and from storage. Restored prices are kept until startup
+        completes, as their sensors may not have registered yet."""
+        tracked = self._tracked()
+        if self._started:
+            for entity_id in [e for e in self._restored if e not in tracked]:
+                del self._restored[entity_id]
+        for entity_id in {*self._cache, *self._adapters} - tracked:
+            self.invalidate(entity_id)
+        for key in list(self._timelines):
+            if not tracked.issuperset(filter(None, key)):
+                del self._timelines[key]
+                self._prepared.pop(key, None)
+        self._persist.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        series_by_entity = dict(self._restored)
+        tracked = self._tracked()
+        for entity_id, (_, series) in self._cache.items():
+            if series and entity_id in tracked:
+                series_by_entity[entity_id] = series
+        return {
+            entity_id: {
+                "starts": list(series.starts),
+                "ends": list(series.ends),
+                "prices": list(series.prices),
+            }
+            for entity_id, series in series_by_entity.items()
+        }
+
+    def get(self, entity_id: str) -> PriceSeries:
+        state = self.hass.states.get(entity_id)
+        if state is None or state.state == STATE_UNAVAILABLE:
+            # The source has not loaded (yet): serve the persisted prices.
+            self._cache.pop(entity_id, None)
+            return self._restored.get(entity_id) or PriceSeries.from_segments(())
+        key = (state.last_updated, state.context.id)
+        cached = self._cache.get(entity_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        series = read_price_series(state, self._adapter(entity_id, state))
+        # Unchanged prices keep the previous object, so timelines, indexes
+        # and plans built on it are reused.
+        previous = self._restored.pop(entity_id, None)
+        if previous is None and cached is not None:
+            previous = cached[1]
+        if previous is not None and _same_series(previous, series):
+            series = previous
+        elif self._started:
+            # Sources read only by the services are let go at each change.
+            self.async_prune()
+        else:
+            self._persist.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+        self._cache[entity_id] = (key, series)
+        return series
+
+    def _adapter(self, entity_id: str, state: State) -> Optional[SourceAdapter]:
+        adapter = self._adapters.get(entity_id)
+        if adapter is not None and adapter.matches(state.attributes or {}):
+            return adapter
+        adapter = detect_adapter(state)
+        if adapter is None:
+            self._adapters.pop(entity_id, None)
+        else:
+            self._adapters[entity_id] = adapter
+        return adapter
+
+    def adapter_name(self, entity_id: str) -> Optional[str]:
+        adapter = self._adapters.get(entity_id)
+        return adapter.name if adapter is not None else None
+
+    def timeline(
+        self, entity_id: str, forecast_entity_id: Optional[str] = None
+    ) -> PriceSeries:
+        """Primary series with the forecast filling its gaps, merged once per
+        source change and shared by every caller."""
+        primary = self.get(entity_id)
+        forecast = self.get(forecast_entity_id) if forecast_entity_id else None
+        key = (entity_id, forecast_entity_id)
+        cached = self._timelines.get(key)
+        if cached is not None and cached[0] is primary and cached[1] is forecast:
+            return cached[2]
+        merged = merge_forecast(primary, forecast) if forecast is not None else primary
+        self._timelines[key] = (primary, forecast, merged)
+        return merged
+
+    def prepared(
+        self, entity_id: str, forecast_entity_id: Optional[str] = None
+    ) -> PreparedTimeline:
+        series = self.timeline(entity_id, forecast_entity_id)
+        key = (entity_id, forecast_entity_id)
+        prepared = self._prepared.get(key)
+        if prepared is None or prepared.series is not series:
+            prepared = self._prepared[key] = PreparedTimeline(series)
+        return prepared
+
+    def invalidate(self, entity_id: Optional[str] = None) -> None:
+        if entity_id is None:
+            self._cache.clear()
+            self._adapters.clear()
+        else:
+            self._cache.pop(entity_id, None)
+            self._adapters.pop(entity_id, None)
+
+
+def _same_series(a: PriceSeries, b: PriceSeries) -> bool:
+    return (
+        a.starts == b.starts
+        and a.ends == b.ends
+        and a.prices == b.prices
+        and a.lower == b.lower
+        and a.upper == b.upper
+    )
+
+
+def get_price_store(hass: HomeAssistant) -> PriceStore:
+    data = hass.data.setdefault(DOMAIN, {})
+    store = data.get(DATA_PRICE_STORE)
+    if store is None:
+        store = data[DATA_PRICE_STORE] = PriceStore(hass)
+    return store
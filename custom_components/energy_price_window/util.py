@@ -0,0 +1,264 @@
+from __future__ import annotations
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import TemplateError
+from homeassistant.helpers import template
+from homeassistant.util import dt as dt_util
+
+from .core import BlockConstraints, Interval
+from .sources import parse_datetime
+
+
+def parse_time_of_day(value: Any) -> Optional[time]:
+    if isinstance(value, time):
+        return value
+    if not isinstance(value, str):
+        return None
+    s = value.strip()
+    if ":" not in s or "T" in s or "-" in s or "/" in s:
+        return None
+    try:
+        parts = s.split(":")
+        h = int(parts[0])
+        m = int(parts[1])
+        sec = float(parts[2]) if len(parts) > 2 else 0.0
+        sec_i = int(sec)
+        micro = int(round((sec - sec_i) * 1_000_000))
+        return time(h, m, sec_i, micro)
+    except Exception:
+        return None
+
+
+def parse_today_time(value: Any, now_local: datetime) -> Optional[datetime]:
+    tod = parse_time_of_day(value)
+    if tod is None:
+        return None
+    if now_local.tzinfo is None:
+        now_local = now_local.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    base = dt_util.as_local(now_local)
+    out = base.replace(
+        hour=tod.hour,
+        minute=tod.minute,
+        second=tod.second,
+        microsecond=tod.microsecond,
+    )
+    if out.tzinfo is None:
+        out = out.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return out
+
+
+def parse_time_value(value: Any) -> Any:
+    """Typed start/end value: a time of day, an aware datetime or None."""
+    return parse_time_of_day(value) or parse_datetime(value)
+
+
+def parse_duration(value: Any) -> Optional[timedelta]:
+    if isinstance(value, timedelta):
+        return value
+    if isinstance(value, (int, float)):
+        return timedelta(hours=float(value))
+    if isinstance(value, str):
+        v = value.strip()
+        if ":" in v:
+            parts = v.split(":")
+            if len(parts) >= 2:
+                try:
+                    h = float(parts[0])
+                    m = float(parts[1])
+                    s = float(parts[2]) if len(parts) > 2 else 0.0
+                    return timedelta(hours=h, minutes=m, seconds=s)
+                except Exception:
+                    return None
+        try:
+            return timedelta(hours=float(v))
+        except Exception:
+            return None
+    return None
+
+
+def parse_load_profile(value: Any) -> Optional[Tuple[float, ...]]:
+    """kW per step from a list or a comma/space separated string."""
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+    if not isinstance(value, (list, tuple)) or not value:
+        return None
+    try:
+        profile = tuple(float(v) for v in value)
+    except (TypeError, ValueError):
+        return None
+    if any(kw < 0 for kw in profile) or not any(profile):
+        return None
+    return profile
+
+
+def parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        v = value.strip().lower()
+        if v in ("true", "on", "1", "yes"):
+            return True
+        if v in ("false", "off", "0", "no"):
+            return False
+    return False
+
+
+def parse_block_constraints(
+    min_block: Any, max_blocks: Any, min_gap: Any
+) -> Optional[BlockConstraints]:
+    """BlockConstraints from config values, or None when none are set."""
+    block_td = parse_duration(min_block) if min_block not in (None, "") else None
+    gap_td = parse_duration(min_gap) if min_gap not in (None, "") else None
+    try:
+        blocks = max(0, int(float(max_blocks or 0)))
+    except (TypeError, ValueError):
+        blocks = 0
+    block_s = block_td.total_seconds() if block_td else 0.0
+    gap_s = gap_td.total_seconds() if gap_td else 0.0
+    if block_s <= 0 and gap_s <= 0 and blocks == 0:
+        return None
+    return BlockConstraints(max(0.0, block_s), blocks, max(0.0, gap_s))
+
+
+class ConfigValue:
+    """An option that is either a literal or a template.
+
+    Literals are parsed once at construction; templates are rendered and
+    parsed on first use and then only when their tracker reports a new
+    result.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, raw: Any, parse: Callable[[Any], Any]
+    ) -> None:
+        self._parse = parse
+        self.configured = raw not in (None, "")
+        self.template: Optional[template.Template] = None
+        self._value: Any = None
+        self._valid = True
+        if self.configured and template.is_template_string(str(raw)):
+            self.template = template.Template(str(raw), hass)
+            self._valid = False
+        elif self.configured:
+            self._value = parse(raw)
+
+    @property
+    def is_static(self) -> bool:
+        return self.template is None
+
+    def set_result(self, result: Any) -> None:
+        if isinstance(result, TemplateError):
+            result = None
+        self._value = self._parse(result)
+        self._valid = True
+
+    def value(self) -> Any:
+        if not self._valid:
+            self.set_result(self._render())
+        return self._value
+
+    def _render(self) -> Any:
+        try:
+            return self.template.async_render(parse_result=True)
+        except TypeError:
+            return self.template.async_render()
+
+
+def to_local(ts: float) -> datetime:
+    return dt_util.as_local(dt_util.utc_from_timestamp(ts))
+
+
+def resolve_range(
+    start_val: Any,
+    end_val: Any,
+    duration_td: timedelta,
+    now_local: datetime,
+    data_end: float,
+) -> Tuple[datetime, datetime]:
+    """Resolve start/end values to the search range.
+
+    Start defaults to now and end to the end of the available data; an end
+    that has already passed rolls over to the next day.
+    """
+    start_dt = None
+    if start_val is not None:
+        start_dt = parse_today_time(start_val, now_local) or parse_datetime(
+            start_val
+        )
+    if start_dt is None:
+        start_dt = now_local
+
+    end_dt = None
+    if end_val is not None:
+        end_dt = parse_today_time(end_val, now_local) or parse_datetime(end_val)
+    if end_dt is None:
+        end_dt = to_local(data_end)
+
+    if start_dt.tzinfo is None:
+        start_dt = start_dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    if end_dt.tzinfo is None:
+        end_dt = end_dt.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+
+    if end_dt <= now_local:
+        end_dt = end_dt + timedelta(days=1)
+
+    if start_dt + duration_td > end_dt:
+        end_dt = start_dt + duration_td
+    return start_dt, end_dt
+
+
+def _time_of(value: Any) -> Optional[time]:
+    if isinstance(value, time):
+        return value
+    if isinstance(value, datetime):
+        return dt_util.as_local(value).time()
+    return parse_time_of_day(value)
+
+
+def day_ranges(
+    start_val: Any,
+    end_val: Any,
+    now_local: datetime,
+    data_start: float,
+    data_end: float,
+) -> List[Tuple[datetime, datetime]]:
+    """One range per local day from today to the end of the data.
+
+    Only the time of day of start/end is used; a missing start is midnight,
+    a missing end the next midnight, and an end at or before the start falls
+    on the next day. Ranges that have already ended are skipped.
+    """
+    start_tod = _time_of(start_val) or time(0)
+    end_tod = _time_of(end_val)
+    tz = dt_util.DEFAULT_TIME_ZONE
+    last = to_local(data_end)
+    day = max(to_local(data_start), now_local).date() - timedelta(days=1)
+    out: List[Tuple[datetime, datetime]] = []
+    while True:
+        s = datetime.combine(day, start_tod, tzinfo=tz)
+        if s >= last:
+            return out
+        if end_tod is None:
+            e = dt_util.start_of_local_day(day + timedelta(days=1))
+        else:
+            e = datetime.combine(day, end_tod, tzinfo=tz)
+            if e <= s:
+                e = datetime.combine(day + timedelta(days=1), end_tod, tzinfo=tz)
+        if e > now_local:
+            out.append((s, e))
+        day += timedelta(days=1)
+
+
+def format_intervals(intervals: List[Interval]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "start": to_local(s).isoformat(),
+            "end": to_local(e).isoformat(),
+            "average": a,
+        }
+        for s, e, a in intervals
+    ]
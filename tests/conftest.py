@@ -0,0 +1,50 @@
+"""Load the integration's core module without Home Assistant.
+
+The package ``__init__`` imports Home Assistant, so core is imported through
+a bare package module pointing at the integration folder instead. The
+``core`` fixture runs a test on the pure-Python path and, when NumPy is
+installed, on the NumPy backend as well.
+"""
+from __future__ import annotations
+import importlib
+import importlib.util
+from pathlib import Path
+import sys
+import types
+
+import pytest
+
+PACKAGE_DIR = (
+    Path(__file__).resolve().parents[1] / "custom_components" / "energy_price_window"
+)
+
+
+def _load_packaged() -> types.ModuleType:
+    # Relative imports resolve, so numpy_backend is used when importable.
+    package = types.ModuleType("_energy_price_window")
+    package.__path__ = [str(PACKAGE_DIR)]
+    sys.modules[package.__name__] = package
+    return importlib.import_module(package.__name__ + ".core")
+
+
+def _load_standalone() -> types.ModuleType:
+    # Without a parent package the numpy_backend import fails, as it does
+    # when NumPy is missing.
+    spec = importlib.util.spec_from_file_location(
+        "_energy_price_window_core", PACKAGE_DIR / "core.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+BACKENDS = {"python": _load_standalone()}
+_packaged = _load_packaged()
+if _packaged.BACKEND == "numpy":
+    BACKENDS["numpy"] = _packaged
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def core(request) -> types.ModuleType:
+    return BACKENDS[request.param]
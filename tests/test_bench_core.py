@@ -0,0 +1,155 @@
+"""Timings of the window algorithms over synthetic price horizons.
+
+Horizons span hourly, 15-minute and 5-minute prices over 1 to 14 days,
+either fully priced or priced for the first hours and filled from an
+hourly forecast. Each index case builds the index and selects once per
+hour of a day, as the sensor does between price updates.
+
+Needs pytest-benchmark (``pip install pytest-benchmark``); the module is
+skipped without it. Run only these with ``pytest tests/test_bench_core.py``,
+or pass ``--benchmark-disable`` to run each case once as a plain test.
+
+Timings are not asserted, as they depend on the machine. Save a baseline
+with ``--benchmark-autosave`` and check a change against it with
+``--benchmark-compare --benchmark-compare-fail=mean:25%``.
+"""
+from __future__ import annotations
+import math
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+ORIGIN = 1_700_000_000.0
+HOUR = 3600.0
+
+
+def synthetic_series(core, days: float, slot: float, seed: int = 0):
+    """A daily price curve with noise, ``days`` long at ``slot`` seconds."""
+    rng = random.Random(seed)
+    segs = []
+    for j in range(int(days * 24 * HOUR / slot)):
+        t = ORIGIN + j * slot
+        daily = math.sin((t % (24 * HOUR)) / (24 * HOUR) * 2 * math.pi)
+        segs.append((t, t + slot, round(1.5 + daily + rng.uniform(-0.4, 0.4), 3)))
+    return core.PriceSeries.from_segments(segs)
+
+
+# Prices published so far when a forecast fills the rest of the horizon.
+KNOWN_HOURS = 12
+
+RESOLUTIONS = {"hourly": 3600.0, "15min": 900.0, "5min": 300.0}
+HORIZONS = [
+    pytest.param(slot, days, forecast, id=f"{name}-{days}d-{label}")
+    for name, slot in RESOLUTIONS.items()
+    for days in (1, 7, 14)
+    for forecast, label in ((False, "priced"), (True, "forecast"))
+]
+FORECAST_HORIZONS = [p for p in HORIZONS if p.values[2]]
+
+
+def horizon_parts(core, slot: float, days: int):
+    """Known prices for the first hours and an hourly forecast of the rest."""
+    known = synthetic_series(core, KNOWN_HOURS / 24, slot)
+    return known, synthetic_series(core, days, HOUR, seed=1)
+
+
+def horizon(core, slot: float, days: int, forecast: bool):
+    if not forecast:
+        return synthetic_series(core, days, slot)
+    return core.merge_forecast(*horizon_parts(core, slot, days))
+
+
+def run_index(benchmark, make_index, series):
+    range_end = series.end(len(series) - 1)
+
+    def build_and_select():
+        index = make_index(series, range_end)
+        for h in range(24):
+            index.select(ORIGIN + h * HOUR)
+        return index.select(ORIGIN)
+
+    return benchmark.pedantic(build_and_select, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("slot,days,forecast", FORECAST_HORIZONS)
+def test_merge_forecast(benchmark, core, slot, days, forecast):
+    known, hourly = horizon_parts(core, slot, days)
+    merged = benchmark(core.merge_forecast, known, hourly)
+    assert merged.end(len(merged) - 1) == hourly.end(len(hourly) - 1)
+
+
+@pytest.mark.parametrize("slot,days,forecast", HORIZONS)
+def test_continuous_index(benchmark, core, slot, days, forecast):
+    series = horizon(core, slot, days, forecast)
+    result = run_index(
+        benchmark,
+        lambda segs, end: core.ContinuousIndex(segs, end, 3 * HOUR),
+        series,
+    )
+    assert len(result) == 1
+
+
+@pytest.mark.parametrize("slot,days,forecast", HORIZONS)
+def test_slot_index(benchmark, core, slot, days, forecast):
+    series = horizon(core, slot, days, forecast)
+    result = run_index(
+        benchmark,
+        lambda segs, end: core.SlotIndex(segs, end, 3 * HOUR),
+        series,
+    )
+    assert sum(e - s for s, e, _ in result) == pytest.approx(3 * HOUR)
+
+
+@pytest.mark.parametrize("slot,days,forecast", HORIZONS)
+def test_constrained_index(benchmark, core, slot, days, forecast):
+    series = horizon(core, slot, days, forecast)
+    constraints = core.BlockConstraints(HOUR, 0, HOUR)
+    result = run_index(
+        benchmark,
+        lambda segs, end: core.ConstrainedIndex(segs, end, 3 * HOUR, constraints),
+        series,
+    )
+    assert sum(e - s for s, e, _ in result) == pytest.approx(3 * HOUR)
+
+
+@pytest.mark.parametrize("slot,days,forecast", HORIZONS)
+def test_profile_index(benchmark, core, slot, days, forecast):
+    series = horizon(core, slot, days, forecast)
+    # A heating phase followed by a long low draw, in 15-minute steps.
+    profile = [2.0] * 4 + [0.5] * 8
+    result = run_index(
+        benchmark,
+        lambda segs, end: core.ProfileIndex(segs, end, profile, 900.0),
+        series,
+    )
+    assert sum(e - s for s, e, _ in result) == pytest.approx(3 * HOUR)
+
+
+# (duration h, min_block h, max_blocks, min_gap h)
+CONSTRAINED_CASES = [
+    (24, 0.25, 0, 0.25),
+    (8, 0, 0, 1),
+    (8, 0.5, 4, 1),
+    (24, 1, 6, 1),
+]
+
+
+@pytest.mark.parametrize("duration,min_block,max_blocks,min_gap", CONSTRAINED_CASES)
+def test_constrained_index_14_days(
+    benchmark, core, duration, min_block, max_blocks, min_gap
+):
+    series = synthetic_series(core, 14, 900.0)
+    range_end = series.end(len(series) - 1)
+    constraints = core.BlockConstraints(min_block * HOUR, max_blocks, min_gap * HOUR)
+
+    def build_and_select():
+        index = core.ConstrainedIndex(series, range_end, duration * HOUR, constraints)
+        # A day of wake-ups: the range start moves slot by slot.
+        for j in range(96):
+            index.select(ORIGIN + j * 900.0)
+        return index.select(ORIGIN)
+
+    result = benchmark.pedantic(build_and_select, rounds=3, iterations=1)
+    assert sum(e - s for s, e, _ in result) == pytest.approx(duration * HOUR)
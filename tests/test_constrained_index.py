@@ -0,0 +1,114 @@
+"""ConstrainedIndex against exhaustive search on small random cases."""
+from __future__ import annotations
+from itertools import combinations
+import math
+import random
+from typing import List, Optional
+
+import pytest
+
+STEP = 900.0
+ORIGIN = 1_700_000_000.0
+
+
+def blocks_of(slots) -> List[List[int]]:
+    blocks: List[List[int]] = []
+    for j in slots:
+        if blocks and blocks[-1][1] == j:
+            blocks[-1][1] = j + 1
+        else:
+            blocks.append([j, j + 1])
+    return blocks
+
+
+def brute_force_cost(
+    prices: List[Optional[float]],
+    first: int,
+    need: int,
+    run: int,
+    max_blocks: int,
+    gap: int,
+) -> float:
+    """Cheapest feasible set of ``need`` slots from ``first`` on, trying all."""
+    best = math.inf
+    slots = [j for j in range(first, len(prices)) if prices[j] is not None]
+    for combo in combinations(slots, need):
+        blocks = blocks_of(combo)
+        if any(e - s < run for s, e in blocks):
+            continue
+        if max_blocks and len(blocks) > max_blocks:
+            continue
+        if any(b[0] - a[1] < gap for a, b in zip(blocks, blocks[1:])):
+            continue
+        best = min(best, sum(prices[j] for j in combo) * STEP)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_brute_force(core, seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        n = rng.randint(2, 12)
+        # None marks a slot without price data.
+        prices = [
+            None if 0 < j < n - 1 and rng.random() < 0.1 else float(rng.randint(-3, 9))
+            for j in range(n)
+        ]
+        segs = [
+            (ORIGIN + j * STEP, ORIGIN + (j + 1) * STEP, p)
+            for j, p in enumerate(prices)
+            if p is not None
+        ]
+        need = rng.randint(1, n)
+        run = rng.randint(1, 3)
+        max_blocks = rng.choice((0, 0, 1, 2, 3))
+        gap = rng.randint(0, 3)
+        first = rng.randrange(n)
+        index = core.ConstrainedIndex(
+            core.PriceSeries.from_segments(segs),
+            ORIGIN + n * STEP,
+            need * STEP,
+            core.BlockConstraints(run * STEP, max_blocks, gap * STEP),
+        )
+        got = index.select(ORIGIN + first * STEP)
+        # A minimum block longer than the duration means one block.
+        run = min(run, need)
+        expected = brute_force_cost(prices, first, need, run, max_blocks, gap)
+        if expected == math.inf:
+            assert got == []
+            continue
+        assert sum((e - s) * avg for s, e, avg in got) == pytest.approx(expected)
+        assert sum(e - s for s, e, _ in got) == pytest.approx(need * STEP)
+        blocks = [(s, e) for s, e, _ in got]
+        assert blocks[0][0] >= ORIGIN + first * STEP
+        assert all(e - s >= run * STEP for s, e in blocks)
+        assert not max_blocks or len(blocks) <= max_blocks
+        assert all(b[0] - a[1] >= gap * STEP for a, b in zip(blocks, blocks[1:]))
+
+
+def test_partial_last_slot(core):
+    segs = [(ORIGIN + j * STEP, ORIGIN + (j + 1) * STEP, float(j % 4)) for j in range(16)]
+    index = core.ConstrainedIndex(
+        core.PriceSeries.from_segments(segs),
+        ORIGIN + 16 * STEP,
+        2.5 * STEP,
+        core.BlockConstraints(2 * STEP, 0, 0.0),
+    )
+    # Slots 0-2 and 4-6 cost the same; the earlier wins and its last slot is
+    # trimmed to the half still needed.
+    [(start, end, avg)] = index.select(ORIGIN)
+    assert (start, end) == (ORIGIN, ORIGIN + 2.5 * STEP)
+    assert avg == pytest.approx((0.0 + 1.0 + 2.0 * 0.5) / 2.5)
+
+
+def test_min_block_longer_than_duration(core):
+    segs = [(ORIGIN + j * STEP, ORIGIN + (j + 1) * STEP, float(j % 4)) for j in range(16)]
+    index = core.ConstrainedIndex(
+        core.PriceSeries.from_segments(segs),
+        ORIGIN + 16 * STEP,
+        2 * STEP,
+        core.BlockConstraints(4 * STEP, 0, 0.0),
+    )
+    assert index.select(ORIGIN + STEP) == [
+        (ORIGIN + 4 * STEP, ORIGIN + 6 * STEP, pytest.approx(0.5))
+    ]
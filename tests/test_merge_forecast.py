@@ -0,0 +1,80 @@
+"""merge_forecast against the per-interval subtraction it replaced."""
+from __future__ import annotations
+import random
+from typing import List, Tuple
+
+import pytest
+
+Segment = Tuple[float, float, float]
+
+ORIGIN = 1_700_000_000.0
+
+
+def subtract_blockers(
+    segment: Tuple[float, float],
+    blockers: List[Tuple[float, float]],
+) -> List[Tuple[float, float]]:
+    """The parts of ``segment`` outside every blocker, as the sensor cut
+    each forecast interval before the sweep: one pass per blocker."""
+    s0, e0 = segment
+    if not blockers:
+        return [(s0, e0)]
+    rem = [(s0, e0)]
+    for bs, be in blockers:
+        new_rem = []
+        for rs, re in rem:
+            if be <= rs or bs >= re:
+                new_rem.append((rs, re))
+                continue
+            if bs <= rs and be >= re:
+                continue
+            if bs <= rs < be < re:
+                new_rem.append((be, re))
+                continue
+            if rs < bs < re <= be:
+                new_rem.append((rs, bs))
+                continue
+            if rs < bs and be < re:
+                new_rem.append((rs, bs))
+                new_rem.append((be, re))
+                continue
+        rem = new_rem
+        if not rem:
+            break
+    return rem
+
+
+def reference_merge(core, primary: List[Segment], forecast: List[Segment]):
+    blockers = core.merge_overlaps([(s, e) for s, e, _ in primary])
+    parts = [
+        (s, e, p)
+        for fs, fe, p in forecast
+        for s, e in subtract_blockers((fs, fe), blockers)
+        if e > s
+    ]
+    return sorted(primary + parts, key=lambda seg: seg[0])
+
+
+def random_run(rng: random.Random, slot: float, t: float, count: int):
+    segs: List[Segment] = []
+    for _ in range(count):
+        if rng.random() < 0.15:
+            t += slot * rng.randint(1, 3)
+        segs.append((t, t + slot, round(rng.uniform(-0.5, 3.0), 2)))
+        t += slot
+    return segs
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_blocker_subtraction(core, seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        slot = rng.choice((900.0, 3600.0))
+        start = ORIGIN + rng.randrange(0, 7200, 300)
+        primary = random_run(rng, slot, start, rng.randint(0, 40))
+        forecast = random_run(rng, 3600.0, ORIGIN, rng.randint(0, 60))
+        merged = core.merge_forecast(
+            core.PriceSeries.from_segments(primary),
+            core.PriceSeries.from_segments(forecast),
+        )
+        assert list(merged) == reference_merge(core, primary, forecast)
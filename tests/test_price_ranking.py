@@ -0,0 +1,98 @@
+"""Percentile, rank and threshold queries on a small hand-checked series."""
+from __future__ import annotations
+
+import pytest
+
+# Mixed lengths, equal prices and a gap between 9900 and 10800. Sorted by
+# price: 0.5 (900 s), 1.0 (900, 900, 1800 s), 2.0 (3600 s), 3.0 (3600 s),
+# so the cumulative time is 900, 4500, 8100 and 11700 s at each new price.
+SEGMENTS = [
+    (0.0, 3600.0, 2.0),
+    (3600.0, 4500.0, 1.0),
+    (4500.0, 5400.0, 1.0),
+    (5400.0, 9000.0, 3.0),
+    (9000.0, 9900.0, 0.5),
+    (10800.0, 12600.0, 1.0),
+]
+TOTAL = 11700.0
+
+
+@pytest.fixture
+def series(core):
+    return core.PriceSeries.from_segments(SEGMENTS)
+
+
+@pytest.mark.parametrize(
+    "seconds,expected",
+    [
+        (0.0, 0.5),
+        (900.0, 0.5),
+        (901.0, 1.0),
+        (4500.0, 1.0),
+        (4501.0, 2.0),
+        (8100.0, 2.0),
+        (8101.0, 3.0),
+        (TOTAL, 3.0),
+    ],
+)
+def test_percentile_at_bucket_edges(core, series, seconds, expected):
+    assert core.PriceRanking(series).percentile(seconds / TOTAL) == expected
+
+
+@pytest.mark.parametrize(
+    "price,cheaper",
+    [
+        (0.1, 0.0),
+        (0.5, 0.0),
+        (1.0, 900.0),
+        (1.5, 4500.0),
+        (2.0, 4500.0),
+        (3.5, TOTAL),
+    ],
+)
+def test_rank_counts_strictly_cheaper_time(core, series, price, cheaper):
+    assert core.PriceRanking(series).rank(price) == pytest.approx(cheaper / TOTAL)
+
+
+def test_time_at_or_below_includes_equal_prices(core, series):
+    ranking = core.PriceRanking(series)
+    assert ranking.total == TOTAL
+    assert ranking.time_at_or_below(1.0) == 4500.0
+    assert ranking.time_at_or_below(0.4) == 0.0
+
+
+def test_empty_ranking(core):
+    ranking = core.PriceRanking(core.PriceSeries.from_segments([]))
+    assert ranking.rank(1.0) is None
+    assert ranking.percentile(0.5) is None
+
+
+@pytest.mark.parametrize(
+    "t,expected",
+    [
+        (-1.0, None),
+        (0.0, 2.0),
+        (3600.0, 1.0),
+        (9899.0, 0.5),
+        (10000.0, None),
+        (12600.0, None),
+    ],
+)
+def test_price_at(core, series, t, expected):
+    assert core.price_at(series, t) == expected
+
+
+def test_threshold_merges_equal_neighbours(core, series):
+    assert core.intervals_at_or_below(series, 1.0) == [
+        (3600.0, 5400.0, 1.0),
+        (9000.0, 9900.0, 0.5),
+        (10800.0, 12600.0, 1.0),
+    ]
+
+
+def test_threshold_groups_adjacent_prices(core, series):
+    [first, *rest] = core.intervals_at_or_below(series, 2.0)
+    assert first[:2] == (0.0, 5400.0)
+    assert first[2] == pytest.approx((2.0 * 3600 + 1.0 * 1800) / 5400)
+    # The 3.0 slot and the gap before 10800 keep the rest apart.
+    assert rest == [(9000.0, 9900.0, 0.5), (10800.0, 12600.0, 1.0)]
@@ -0,0 +1,19 @@
+"""The shared series cannot be changed by one of its readers."""
+from __future__ import annotations
+import pickle
+
+import pytest
+
+
+def test_columns_are_read_only(core):
+    series = core.PriceSeries.from_segments([(0.0, 900.0, 1.0), (900.0, 1800.0, 2.0)])
+    for column in (series.starts, series.ends, series.prices):
+        with pytest.raises(TypeError):
+            column[0] = 99.0
+    with pytest.raises(TypeError):
+        series.clip(0.0, 1800.0).prices[0] = 99.0
+    # Worker processes get read-only columns too.
+    copy = pickle.loads(pickle.dumps(series))
+    assert list(copy) == list(series)
+    with pytest.raises(TypeError):
+        copy.prices[0] = 99.0
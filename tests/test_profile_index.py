@@ -0,0 +1,99 @@
+"""ProfileIndex against a direct profile × price integration per start."""
+from __future__ import annotations
+import math
+import random
+from typing import List, Optional, Sequence, Tuple
+
+import pytest
+
+Segment = Tuple[float, float, float]
+
+ORIGIN = 1_700_000_000.0
+SLOT_LENGTHS = (900.0, 900.0, 1800.0, 3600.0)
+
+
+def random_segments(rng: random.Random) -> List[Segment]:
+    """Mixed slot lengths, occasional gaps and coarse prices."""
+    segs: List[Segment] = []
+    t = ORIGIN
+    for _ in range(rng.randint(1, 40)):
+        if rng.random() < 0.08:
+            t += rng.choice(SLOT_LENGTHS)
+        length = rng.choice(SLOT_LENGTHS)
+        segs.append((t, t + length, float(rng.randint(-2, 6))))
+        t += length
+    return segs
+
+
+def price_integral(segs: List[Segment], t0: float, t1: float) -> Tuple[float, float]:
+    """(price·seconds, covered seconds) of [t0, t1)."""
+    cost = covered = 0.0
+    for s, e, p in segs:
+        d = min(e, t1) - max(s, t0)
+        if d > 0:
+            cost += p * d
+            covered += d
+    return cost, covered
+
+
+def brute_force_costs(
+    segs: List[Segment],
+    range_start: float,
+    range_end: float,
+    profile: Sequence[float],
+    step: float,
+) -> List[Tuple[float, float]]:
+    """(start, cost) of every fully priced run on the step grid from the
+    first segment, starting at or after ``range_start``."""
+    origin = segs[0][0]
+    runs = []
+    j = 0
+    while origin + (j + len(profile)) * step <= range_end + 1e-6:
+        t = origin + j * step
+        j += 1
+        if t < range_start - 1e-6:
+            continue
+        cost = 0.0
+        for k, kw in enumerate(profile):
+            c, covered = price_integral(segs, t + k * step, t + (k + 1) * step)
+            if covered + 1e-6 < step:
+                break
+            cost += kw * c / 3600
+        else:
+            runs.append((t, cost))
+    return runs
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_matches_brute_force(core, seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        segs = random_segments(rng)
+        step = rng.choice((300.0, 900.0, 1800.0))
+        profile = [float(rng.randint(0, 3)) for _ in range(rng.randint(1, 8))]
+        last = segs[-1][1]
+        range_end = last - rng.choice((0.0, 450.0, 3600.0))
+        # Range starts off the step grid as well as on it.
+        range_start = ORIGIN + rng.uniform(0, (last - ORIGIN) / 2)
+        index = core.ProfileIndex(
+            core.PriceSeries.from_segments(segs), range_end, profile, step
+        )
+        runs = brute_force_costs(segs, range_start, range_end, profile, step)
+        got: Optional[Tuple[float, float]] = index.select_run(range_start)
+        if not runs:
+            assert got is None
+            assert index.select(range_start) == []
+            continue
+        best = min(cost for _, cost in runs)
+        assert got is not None
+        start, cost = got
+        assert cost == pytest.approx(best, abs=1e-9)
+        # Earliest of the cheapest starts.
+        assert start == min(t for t, c in runs if math.isclose(c, best, abs_tol=1e-9))
+        energy = sum(profile) * step / 3600
+        [(s, e, avg)] = index.select(range_start)
+        assert (s, e) == (start, start + len(profile) * step)
+        if energy:
+            assert avg == pytest.approx(best / energy, abs=1e-9)
+        else:
+            assert avg is None
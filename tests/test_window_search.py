@@ -0,0 +1,128 @@
+"""Continuous search against the scan it replaced, on random price series."""
+from __future__ import annotations
+import random
+from typing import List, Optional, Tuple
+
+import pytest
+
+Segment = Tuple[float, float, float]
+
+SLOT_LENGTHS = (900.0, 900.0, 1800.0, 3600.0)
+
+
+def random_segments(rng: random.Random) -> List[Segment]:
+    """Mixed slot lengths, occasional gaps and prices on a coarse grid, so
+    equal windows occur as they do with real tariffs."""
+    segs: List[Segment] = []
+    t = 1_700_000_000.0 + rng.randrange(3600)
+    for _ in range(rng.randint(1, 120)):
+        if rng.random() < 0.05:
+            t += rng.choice(SLOT_LENGTHS)
+        length = rng.choice(SLOT_LENGTHS)
+        segs.append((t, t + length, round(rng.uniform(-0.5, 3.0), 2)))
+        t += length
+    return segs
+
+
+def clip(segs: List[Segment], r0: float, r1: float) -> List[Segment]:
+    return [(max(s, r0), min(e, r1), p) for s, e, p in segs if e > r0 and s < r1]
+
+
+def brute_force_window(
+    segs: List[Segment], range_start: float, range_end: float, duration: float
+) -> Optional[Tuple[float, float]]:
+    """(start, average) as the sensor found it before WindowSearch: every
+    segment start is a candidate and every candidate rescans the segments."""
+    candidates = [
+        s for s, _, _ in segs if s >= range_start and s + duration <= range_end
+    ]
+    best: Optional[Tuple[float, float]] = None
+    for s0 in candidates:
+        t_end = s0 + duration
+        total = 0.0
+        covered = 0.0
+        for seg_start, seg_end, price in segs:
+            if seg_end <= s0:
+                continue
+            if seg_start >= t_end:
+                break
+            ss = max(seg_start, s0)
+            ee = min(seg_end, t_end)
+            if ee > ss:
+                total += price * (ee - ss)
+                covered += ee - ss
+            if covered + 1e-6 >= duration:
+                break
+        if covered + 1e-6 < duration or covered <= 0:
+            continue
+        avg = total / covered
+        if best is None or avg < best[1]:
+            best = (s0, avg)
+    return best
+
+
+def assert_same_window(got, expected) -> None:
+    if expected is None:
+        assert got == []
+        return
+    assert len(got) == 1
+    start, _, avg = got[0]
+    assert start == expected[0]
+    assert avg == pytest.approx(expected[1], rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_matches_brute_force(core, seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        segs = random_segments(rng)
+        series = core.PriceSeries.from_segments(segs)
+        first, last = segs[0][0], segs[-1][1]
+        r0 = first + rng.uniform(-3600, (last - first) / 2)
+        r1 = last - rng.uniform(-3600, (last - first) / 3)
+        duration = rng.choice((900.0, 3600.0, 7200.0, 3 * 3600.0 + 600.0))
+        expected = brute_force_window(clip(segs, r0, r1), r0, r1, duration)
+
+        assert_same_window(
+            core.PreparedTimeline(series).continuous(r0, r1, duration), expected
+        )
+        assert_same_window(
+            core.ContinuousIndex(series, r1, duration).select(r0), expected
+        )
+        best = core.cheapest_window(series.clip(r0, r1), r0, r1, duration)
+        if expected is None:
+            assert best is None
+        else:
+            assert best is not None
+            assert best[1] == pytest.approx(expected[1], rel=1e-9, abs=1e-12)
+
+
+def test_moving_range_start_reuses_index(core):
+    rng = random.Random(7)
+    segs = random_segments(rng)
+    while len(segs) < 40:
+        segs = random_segments(rng)
+    series = core.PriceSeries.from_segments(segs)
+    r1 = segs[-1][1]
+    index = core.ContinuousIndex(series, r1, 7200.0)
+    # Forward, then backward: the cached position must not leak between calls.
+    starts = [s for s, _, _ in segs[::3]] + [s + 450.0 for s, _, _ in segs[::-5]]
+    for r0 in starts:
+        expected = brute_force_window(clip(segs, r0, r1), r0, r1, 7200.0)
+        assert_same_window(index.select(r0), expected)
+
+
+def test_select_many_matches_single_selects(core):
+    rng = random.Random(11)
+    segs = random_segments(rng)
+    while len(segs) < 40:
+        segs = random_segments(rng)
+    series = core.PriceSeries.from_segments(segs)
+    first, last = segs[0][0], segs[-1][1]
+    specs = [
+        (first + rng.uniform(0, 3600), last - rng.uniform(0, 3600), duration, cont)
+        for duration in (900.0, 3600.0, 7200.0)
+        for cont in (True, False)
+    ]
+    expected = [core.PreparedTimeline(series).select(*spec) for spec in specs]
+    assert core.select_many(core.PreparedTimeline(series), specs) == expected